@@ -1,33 +1,78 @@
 """API routes for the Change-Aware Auditor with robust input validation."""
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
+import functools
+import re
 import uuid
 import logging
 import hashlib
 
+import orjson
+
+try:
+    import xxhash
+except ImportError:  # Optional speedup; fall back to stdlib BLAKE2b
+    xxhash = None
+
 from app.config import settings
 from app.api.security import rate_limit
-from app.services.orchestrator import create_orchestrator
-from app.services.diff_parser import DiffParser
-from app.services.cache import InMemoryCache
+from app.api.serialization import ORJSONRoute
+from app.services.akashml_client import AkashMLClient
+from app.services.orchestrator import AuditOrchestrator, create_orchestrator
+from app.services.diff_parser import DiffParser, ParsedDiff
+from app.services.cache import InMemoryCache, TieredCache
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 logger = logging.getLogger(__name__)
-cache = InMemoryCache(max_entries=settings.cache_max_entries)
+if settings.cache_sqlite_path:
+    cache = TieredCache(settings.cache_sqlite_path, max_entries=settings.cache_max_entries)
+else:
+    cache = InMemoryCache(max_entries=settings.cache_max_entries)
+
+# Audits currently running, keyed by cache key, so identical concurrent
+# requests share one orchestrator run instead of each calling the LLM
+_INFLIGHT: Dict[str, asyncio.Future] = {}
+_INFLIGHT_LOCK = asyncio.Lock()
 
 # Validation constants
 MAX_LINES = 2000
 MAX_LINE_LENGTH = 5000
 MAX_FILES = 50
-VALID_AUDITS = {"security", "quality", "performance", "best_practices"}
-VALID_DEPTHS = {"quick", "standard", "deep"}
+VALID_AUDITS = frozenset({"security", "quality", "performance", "best_practices"})
+VALID_DEPTHS = frozenset({"quick", "standard", "deep"})
+
+# Matches the start of any line longer than MAX_LINE_LENGTH. Anchoring at line
+# starts keeps the search linear; an unanchored repeat would retry from every
+# offset of a long-but-valid line.
+_LONG_LINE_RE = re.compile(rf"^[^\n]{{{MAX_LINE_LENGTH + 1}}}", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=32)
+def _canonical_audits_key(audits: frozenset) -> str:
+    """Canonical cache-key form of an audit selection (at most 16 subsets)."""
+    return ",".join(sorted(audits)) if audits else "all"
 
 
-def validate_diff_content(diff: str) -> None:
+def new_cache_hasher() -> Any:
+    """Return a fast 128-bit hasher for audit cache keys.
+
+    Uses xxh3_128 when xxhash is installed, otherwise BLAKE2b with a 16-byte
+    digest, matching the orchestrator's per-audit keys. Keys are shared across
+    users and workers through the SQLite tier, so 64 bits is too few.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def validate_diff_content(diff: str, hasher: Optional[Any] = None) -> None:
     """Validate diff content for safety and sanity.
 
+    Checks run on the string itself, without splitting it into lines. If a
+    hasher is given, the diff's UTF-8 bytes are fed to it once validation passes.
     Raises HTTPException on validation failure.
     """
     if not diff or not diff.strip():
@@ -41,20 +86,24 @@ def validate_diff_content(diff: str) -> None:
         )
 
     # Check line count
-    lines = diff.split('\n')
-    if len(lines) > MAX_LINES:
+    line_count = diff.count('\n') + 1
+    if line_count > MAX_LINES:
         raise HTTPException(
             status_code=400,
-            detail=f"Diff exceeds {MAX_LINES} lines limit. Found {len(lines)} lines."
+            detail=f"Diff exceeds {MAX_LINES} lines limit. Found {line_count} lines."
         )
 
     # Check individual line lengths
-    for i, line in enumerate(lines):
-        if len(line) > MAX_LINE_LENGTH:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Line {i+1} exceeds {MAX_LINE_LENGTH} character limit"
-            )
+    long_line = _LONG_LINE_RE.search(diff)
+    if long_line:
+        line_no = diff.count('\n', 0, long_line.start()) + 1
+        raise HTTPException(
+            status_code=400,
+            detail=f"Line {line_no} exceeds {MAX_LINE_LENGTH} character limit"
+        )
+
+    if hasher is not None:
+        hasher.update(diff.encode("utf-8"))
 
 
 class AuditRequest(BaseModel):
@@ -65,15 +114,15 @@ class AuditRequest(BaseModel):
         description="Audit types to run: security, quality, performance, best_practices"
     )
     depth: Optional[str] = Field(
-        default="standard",
-        description="Analysis depth: quick, standard, deep"
+        default=None,
+        description="Analysis depth: quick, standard, deep. Omit to let the server pick by diff size"
     )
 
     @field_validator('audits')
     @classmethod
     def validate_audits(cls, v):
         if v is not None:
-            invalid = set(v) - VALID_AUDITS
+            invalid = [a for a in v if a not in VALID_AUDITS]
             if invalid:
                 raise ValueError(
                     f"Invalid audit types: {', '.join(invalid)}. "
@@ -110,12 +159,141 @@ class AuditResponse(BaseModel):
     metadata: Dict[str, Any]
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value (possibly a list or '*') against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _build_payload(audit_id: str, result: Dict[str, Any], parsed_diff: ParsedDiff) -> Dict[str, Any]:
+    """Build the audit response body.
+
+    The result comes from the orchestrator in the AuditResponse shape, so it is
+    serialized directly rather than re-validated through the Pydantic model.
+    """
+    return {
+        "audit_id": audit_id,
+        "status": "completed",
+        "summary": {
+            "overall_score": result["overall_score"],
+            "risk_level": result["risk_level"],
+            "total_findings": result["total_findings"],
+            "critical_findings": result["critical_findings"]
+        },
+        "audits": result["audits"],
+        "synthesis": result["synthesis"],
+        "metadata": {
+            "files_analyzed": parsed_diff.file_count,
+            "lines_added": parsed_diff.total_additions,
+            "lines_removed": parsed_diff.total_deletions,
+            "languages": list(parsed_diff.languages),
+            "depth": result.get("depth")
+        }
+    }
+
+
+def _get_orchestrator(app: FastAPI) -> AuditOrchestrator:
+    """Return the shared orchestrator, creating it if lifespan did not."""
+    orchestrator = getattr(app.state, "orchestrator", None)
+    if orchestrator is None:
+        orchestrator = create_orchestrator(api_key=settings.akashml_api_key)
+        app.state.orchestrator = orchestrator
+    return orchestrator
+
+
+async def _run_audit(
+    app: FastAPI, request: AuditRequest, parsed_diff: ParsedDiff, cache_key: str, audit_id: str
+) -> Dict[str, Any]:
+    """Run the audit on the shared orchestrator and cache the result."""
+    try:
+        orchestrator = _get_orchestrator(app)
+
+        try:
+            # asyncio.timeout cancels in place instead of wrapping the run in a new task
+            async with asyncio.timeout(300.0):  # 5 minute timeout
+                result = await orchestrator.run_full_audit(
+                    diff_content=request.diff,
+                    selected_audits=request.audits,
+                    depth=request.depth,
+                    parsed_diff=parsed_diff
+                )
+        except asyncio.TimeoutError:
+            logger.error("Audit timed out after 300s: id=%s", audit_id)
+            raise HTTPException(status_code=504, detail="Audit timed out. Try reducing diff size or using 'quick' depth.")
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error("Orchestrator initialization failed: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.error("Audit failed with unexpected error: %s: %s", type(e).__name__, e)
+        raise HTTPException(status_code=500, detail=f"Audit failed: {str(e)[:100]}")
+
+    await cache.set(cache_key, result, settings.cache_ttl_seconds)
+    return result
+
+
+async def _run_audit_coalesced(
+    app: FastAPI, request: AuditRequest, parsed_diff: ParsedDiff, cache_key: str, audit_id: str
+) -> Dict[str, Any]:
+    """Run the audit once per cache key, letting concurrent duplicates await it.
+
+    Followers share the leader's result or exception. If the leader is
+    cancelled (e.g. its client disconnected), followers start over and one of
+    them becomes the new leader.
+    """
+    while True:
+        async with _INFLIGHT_LOCK:
+            inflight = _INFLIGHT.get(cache_key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = asyncio.get_running_loop().create_future()
+                _INFLIGHT[cache_key] = inflight
+        if is_leader:
+            break
+
+        logger.info("Joining in-flight audit for identical request: id=%s", audit_id)
+        try:
+            # Shield so a cancelled follower doesn't cancel the shared run
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            # Only the leader's cancellation is retried; our own propagates
+            if not inflight.cancelled() or asyncio.current_task().cancelling():
+                raise
+            logger.info("In-flight audit was cancelled, retrying: id=%s", audit_id)
+
+    try:
+        result = await _run_audit(app, request, parsed_diff, cache_key, audit_id)
+    except asyncio.CancelledError:
+        inflight.cancel()
+        raise
+    except Exception as e:
+        inflight.set_exception(e)
+        inflight.exception()  # Mark retrieved in case there are no followers
+        raise
+    else:
+        inflight.set_result(result)
+        return result
+    finally:
+        if _INFLIGHT.get(cache_key) is inflight:
+            del _INFLIGHT[cache_key]
+
+
 @router.post(
     "/audit/diff",
-    response_model=AuditResponse,
+    response_class=ORJSONResponse,
+    responses={200: {"model": AuditResponse}},
     dependencies=[Depends(rate_limit)],
 )
-async def audit_diff(request: AuditRequest):
+async def audit_diff(request: AuditRequest, http_request: Request):
     """
     Audit a git diff with evidence-backed analysis.
 
@@ -125,10 +303,22 @@ async def audit_diff(request: AuditRequest):
     - Max files: 50
     - Max line length: 5000 chars
     """
-    logger.info(f"Received audit request: depth={request.depth}, audits={request.audits}")
-
-    # Validate diff content
-    validate_diff_content(request.diff)
+    logger.info("Received audit request: depth=%s, audits=%s", request.depth, request.audits)
+
+    # Validate diff content and hash it for the cache key
+    audits_key = _canonical_audits_key(frozenset(request.audits or ()))
+    hasher = new_cache_hasher()
+    hasher.update(f"{request.depth}|{audits_key}|".encode("utf-8"))
+    validate_diff_content(request.diff, hasher)
+    cache_key = hasher.hexdigest()
+    # The ETag identifies the audit result; audit_id differs on every response
+    etag = f'"{cache_key}"'
+
+    # Repeat clients that already hold this result get a bodyless 304
+    if_none_match = http_request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag) and cache.get(cache_key) is not None:
+        logger.info("Cache hit for audit request, not modified")
+        return Response(status_code=304, headers={"ETag": etag})
 
     # Check API key
     if not settings.akashml_api_key:
@@ -158,130 +348,76 @@ async def audit_diff(request: AuditRequest):
         )
 
     logger.info(
-        f"Parsed diff: {parsed_diff.file_count} files, "
-        f"+{parsed_diff.total_additions}/-{parsed_diff.total_deletions} lines, "
-        f"languages: {list(parsed_diff.languages)}"
+        "Parsed diff: %d files, +%d/-%d lines, languages: %s",
+        parsed_diff.file_count,
+        parsed_diff.total_additions,
+        parsed_diff.total_deletions,
+        parsed_diff.languages,
     )
 
-    # Build cache key
-    audits_key = ",".join(sorted(request.audits)) if request.audits else "all"
-    cache_key_raw = f"{request.depth}|{audits_key}|{request.diff}"
-    cache_key = hashlib.sha256(cache_key_raw.encode("utf-8")).hexdigest()
-
     audit_id = str(uuid.uuid4())
 
-    cached_result = await cache.get(cache_key)
+    cached_result = cache.get(cache_key)
     if cached_result:
         logger.info("Cache hit for audit request")
-        result = cached_result
-        return AuditResponse(
-            audit_id=audit_id,
-            status="completed",
-            summary={
-                "overall_score": result["overall_score"],
-                "risk_level": result["risk_level"],
-                "total_findings": result["total_findings"],
-                "critical_findings": result["critical_findings"]
-            },
-            audits=result["audits"],
-            synthesis=result["synthesis"],
-            metadata={
-                "files_analyzed": parsed_diff.file_count,
-                "lines_added": parsed_diff.total_additions,
-                "lines_removed": parsed_diff.total_deletions,
-                "languages": list(parsed_diff.languages)
-            }
+        return ORJSONResponse(
+            _build_payload(audit_id, cached_result, parsed_diff), headers={"ETag": etag}
         )
 
-    # Create orchestrator and run audit
-    try:
-        orchestrator = create_orchestrator(api_key=settings.akashml_api_key)
-
-        try:
-            result = await asyncio.wait_for(
-                orchestrator.run_full_audit(
-                    diff_content=request.diff,
-                    selected_audits=request.audits,
-                    depth=request.depth or "standard"
-                ),
-                timeout=300.0  # 5 minute timeout
-            )
-        except asyncio.TimeoutError:
-            logger.error(f"Audit timed out after 300s: id={audit_id}")
-            raise HTTPException(status_code=504, detail="Audit timed out. Try reducing diff size or using 'quick' depth.")
-
-        await cache.set(cache_key, result, settings.cache_ttl_seconds)
-
-        logger.info(
-            f"Audit completed: id={audit_id}, score={result['overall_score']}, "
-            f"findings={result['total_findings']}"
-        )
+    # Run the audit, sharing the run with identical in-flight requests
+    result = await _run_audit_coalesced(http_request.app, request, parsed_diff, cache_key, audit_id)
 
-        return AuditResponse(
-            audit_id=audit_id,
-            status="completed",
-            summary={
-                "overall_score": result["overall_score"],
-                "risk_level": result["risk_level"],
-                "total_findings": result["total_findings"],
-                "critical_findings": result["critical_findings"]
-            },
-            audits=result["audits"],
-            synthesis=result["synthesis"],
-            metadata={
-                "files_analyzed": parsed_diff.file_count,
-                "lines_added": parsed_diff.total_additions,
-                "lines_removed": parsed_diff.total_deletions,
-                "languages": list(parsed_diff.languages)
-            }
-        )
+    logger.info(
+        "Audit completed: id=%s, score=%s, findings=%s",
+        audit_id, result["overall_score"], result["total_findings"],
+    )
 
-    except ValueError as e:
-        logger.error(f"Orchestrator initialization failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        logger.error(f"Audit failed with unexpected error: {type(e).__name__}: {e}")
-        raise HTTPException(status_code=500, detail=f"Audit failed: {str(e)[:100]}")
+    return ORJSONResponse(_build_payload(audit_id, result, parsed_diff), headers={"ETag": etag})
+
+
+# /models and /audits return constant data, so serialize it once at import
+_MODELS_BODY = orjson.dumps({
+    "models": AkashMLClient.MODELS,
+    "default": settings.default_model
+})
+
+_AUDITS_BODY = orjson.dumps({
+    "audits": [
+        {
+            "id": "security",
+            "name": "Security Audit",
+            "description": "Detect vulnerabilities (SQL injection, XSS, etc.)",
+            "weight": 0.40
+        },
+        {
+            "id": "quality",
+            "name": "Code Quality",
+            "description": "Assess code structure, naming, complexity",
+            "weight": 0.25
+        },
+        {
+            "id": "performance",
+            "name": "Performance",
+            "description": "Analyze algorithmic efficiency and resource usage",
+            "weight": 0.20
+        },
+        {
+            "id": "best_practices",
+            "name": "Best Practices",
+            "description": "Check error handling, documentation, testing patterns",
+            "weight": 0.15
+        }
+    ]
+})
 
 
 @router.get("/models")
 async def list_models():
     """List available LLM models."""
-    from app.services.akashml_client import AkashMLClient
-    return {
-        "models": AkashMLClient.MODELS,
-        "default": settings.default_model
-    }
+    return Response(content=_MODELS_BODY, media_type="application/json")
 
 
 @router.get("/audits")
 async def list_audits():
     """List available audit types."""
-    return {
-        "audits": [
-            {
-                "id": "security",
-                "name": "Security Audit",
-                "description": "Detect vulnerabilities (SQL injection, XSS, etc.)",
-                "weight": 0.40
-            },
-            {
-                "id": "quality",
-                "name": "Code Quality",
-                "description": "Assess code structure, naming, complexity",
-                "weight": 0.25
-            },
-            {
-                "id": "performance",
-                "name": "Performance",
-                "description": "Analyze algorithmic efficiency and resource usage",
-                "weight": 0.20
-            },
-            {
-                "id": "best_practices",
-                "name": "Best Practices",
-                "description": "Check error handling, documentation, testing patterns",
-                "weight": 0.15
-            }
-        ]
-    }
+    return Response(content=_AUDITS_BODY, media_type="application/json")
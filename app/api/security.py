@@ -3,15 +3,18 @@ from __future__ import annotations
 
 import asyncio
 import time
-from typing import Dict, List
+from collections import deque
+from typing import Deque, Dict
 
 from fastapi import HTTPException, Request
 
 from app.config import settings
 
-_RATE_LIMIT_STORE: Dict[str, List[float]] = {}
-_RATE_LIMIT_LOCK = asyncio.Lock()
-_LAST_CLEANUP = 0.0
+# Per-client request timestamps, oldest first
+_RATE_LIMIT_STORE: Dict[str, Deque[float]] = {}
+# Locks are sharded by client id so unrelated clients don't queue on one lock
+_RATE_LIMIT_LOCK_SHARDS = 16  # Must be a power of two
+_RATE_LIMIT_LOCKS = [asyncio.Lock() for _ in range(_RATE_LIMIT_LOCK_SHARDS)]
 _CLEANUP_INTERVAL = 300  # Clean up every 5 minutes
 
 
@@ -28,25 +31,26 @@ def _extract_client_id(request: Request) -> str:
     return "unknown"
 
 
-async def _cleanup_rate_limit_store(now: float) -> None:
+def _cleanup_rate_limit_store(now: float) -> None:
     """Remove stale entries from rate limit store to prevent memory leak."""
-    global _LAST_CLEANUP
-    if now - _LAST_CLEANUP < _CLEANUP_INTERVAL:
-        return
-
-    _LAST_CLEANUP = now
     cutoff = now - 300  # Remove entries older than 5 minutes
-    to_delete = []
-    for client_id, timestamps in _RATE_LIMIT_STORE.items():
-        # Keep only recent timestamps
-        fresh = [ts for ts in timestamps if ts > cutoff]
-        if not fresh:
-            to_delete.append(client_id)
-        else:
-            _RATE_LIMIT_STORE[client_id] = fresh
+    for client_id, timestamps in list(_RATE_LIMIT_STORE.items()):
+        # Drop stale timestamps in place, then the client if nothing is left
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+        if not timestamps:
+            del _RATE_LIMIT_STORE[client_id]
+
 
-    for client_id in to_delete:
-        del _RATE_LIMIT_STORE[client_id]
+async def rate_limit_cleanup_loop() -> None:
+    """Periodically clean the rate limit store; run as a background task.
+
+    Keeps the O(clients) sweep off the request path. The sweep never awaits,
+    so it runs atomically on the event loop and needs none of the shard locks.
+    """
+    while True:
+        await asyncio.sleep(_CLEANUP_INTERVAL)
+        _cleanup_rate_limit_store(time.monotonic())
 
 
 async def rate_limit(request: Request) -> None:
@@ -55,18 +59,17 @@ async def rate_limit(request: Request) -> None:
     if limit <= 0:
         return
 
-    now = time.time()
+    # Monotonic so wall-clock jumps (NTP, manual changes) can't skew the window
+    now = time.monotonic()
     window = 60
     client_id = _extract_client_id(request)
 
-    async with _RATE_LIMIT_LOCK:
-        # Periodically clean up stale entries
-        await _cleanup_rate_limit_store(now)
-
-        timestamps = _RATE_LIMIT_STORE.get(client_id, [])
+    async with _RATE_LIMIT_LOCKS[hash(client_id) & (_RATE_LIMIT_LOCK_SHARDS - 1)]:
+        timestamps = _RATE_LIMIT_STORE.setdefault(client_id, deque())
         window_start = now - window
-        timestamps = [ts for ts in timestamps if ts > window_start]
+        # Timestamps are appended in order, so stale ones are always at the front
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
         if len(timestamps) >= limit:
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
         timestamps.append(now)
-        _RATE_LIMIT_STORE[client_id] = timestamps
@@ -25,6 +25,11 @@ class Settings(BaseSettings):
     chunk_size_chars: int = 120000
     cache_ttl_seconds: int = 300
     cache_max_entries: int = 256
+    cache_sqlite_path: str = ""  # Persist audit results to this SQLite file; empty keeps memory only
+    max_concurrent_llm: int = 4
+    depth_routing: bool = True  # Down-route small diffs to cheaper models when no depth is requested
+    docs_only_shortcut: bool = False  # Approve .md/.rst-only diffs without running audits
+    batch_audit_prompting: bool = False  # Run all audit types in one LLM call per chunk
 
     # Security: CORS configuration
     # Use comma-separated origins or "*" for development only
@@ -99,6 +104,14 @@ class Settings(BaseSettings):
             return 0
         return v
 
+    @field_validator('max_concurrent_llm')
+    @classmethod
+    def validate_max_concurrent_llm(cls, v: int) -> int:
+        if v < 1:
+            logger.warning("MAX_CONCURRENT_LLM must be at least 1, defaulting to 1")
+            return 1
+        return v
+
     @field_validator('chunk_size_chars')
     @classmethod
     def validate_chunk_size(cls, v: int) -> int:
@@ -2,15 +2,18 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
-import time
 
 from app.config import settings
-from app.api.routes import router
+from app.api.routes import cache, router
+from app.api.security import rate_limit_cleanup_loop
+from app.services.cache import TieredCache
+from app.services.orchestrator import create_orchestrator
 
 # Configure logging
 logging.basicConfig(
@@ -25,10 +28,12 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Initialize services on startup."""
     logger.info("Starting Change-Aware Auditor")
-    logger.info(f"Environment: {settings.environment}")
-    logger.info(f"Log level: {settings.log_level}")
+    logger.info("Environment: %s", settings.environment)
+    logger.info("Log level: %s", settings.log_level)
     if settings.akashml_api_key:
         logger.info("AkashML API key configured")
+        # One orchestrator (and LLM client connection pool) shared by all requests
+        app.state.orchestrator = create_orchestrator(api_key=settings.akashml_api_key)
     else:
         logger.warning("AKASHML_API_KEY not set - API calls will fail")
 
@@ -49,14 +54,24 @@ async def lifespan(app: FastAPI):
                 "CORS_ALLOWED_ORIGINS is set to '*'. "
                 "This is acceptable for development but will be blocked in production."
             )
+
+    cleanup_task = asyncio.create_task(rate_limit_cleanup_loop())
     yield
     logger.info("Shutting down Change-Aware Auditor")
+    cleanup_task.cancel()
+    try:
+        await cleanup_task
+    except asyncio.CancelledError:
+        pass
+    if isinstance(cache, TieredCache):
+        cache.close()
 
 
 app = FastAPI(
     title="Change-Aware Auditor",
     description="AI-powered code change analysis with evidence-backed findings",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -70,23 +85,29 @@ app.add_middleware(
     allow_origins=_cors_origins,
     allow_credentials=_allow_credentials,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log all requests with timing information."""
-    start_time = time.time()
+    # Skip timing and logging entirely when INFO is filtered out
+    if not logger.isEnabledFor(logging.INFO):
+        return await call_next(request)
+
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
 
     # Log request
-    logger.info(f"Request: {request.method} {request.url.path}")
+    logger.info("Request: %s %s", request.method, request.url.path)
 
     response = await call_next(request)
 
     # Calculate request duration
-    duration = time.time() - start_time
-    logger.info(f"Response: {response.status_code} ({duration:.2f}s)")
+    duration = loop.time() - start_time
+    logger.info("Response: %s (%.2fs)", response.status_code, duration)
 
     return response
 
@@ -1,22 +1,167 @@
 """AkashML API Client - OpenAI-compatible interface with robust error handling."""
-from openai import OpenAI
+from openai import AsyncOpenAI
 from openai import (
     APIConnectionError,
+    APIStatusError,
     APITimeoutError,
     RateLimitError,
     AuthenticationError,
     APIError
 )
-from typing import Optional, Dict, Any
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential
+)
+from typing import Optional, Dict, Any, AsyncIterator, Final, List, Tuple
+import contextlib
 import os
-import json
 import re
 import logging
 
+import orjson
+
 from app.config import settings
+from app.services.cache import PromptCache
+from app.services.diff_parser import ParsedDiff
+from app.services.limiter import AdaptiveConcurrencyLimiter
 
 logger = logging.getLogger(__name__)
 
+# Sent byte-identical as the first message of every request so providers with
+# automatic prefix caching can reuse its KV cache instead of re-running prefill.
+# Per-request context belongs in the user message, never in here.
+_DEFAULT_SYSTEM_PROMPT: Final[str] = """You are an expert code auditor specializing in:
+- Security vulnerability detection (OWASP Top 10, CWE patterns)
+- Code quality assessment
+- Performance analysis
+- Best practices review
+
+Provide evidence-backed findings with specific line numbers, clear explanations,
+and actionable fixes. Do not include chain-of-thought; output only final
+answers in valid JSON when requested."""
+
+# Transient errors worth retrying before reporting a failure to the caller
+_TRANSIENT_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError)
+_MAX_BACKOFF_SECONDS = 30
+_backoff = wait_random_exponential(min=1, max=_MAX_BACKOFF_SECONDS)
+
+
+def _retry_after_seconds(error: RateLimitError) -> Optional[float]:
+    """Read a numeric Retry-After header from a 429 response, if present."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to exponential backoff
+
+
+def _wait_before_retry(retry_state) -> float:
+    """Honor Retry-After on 429s, otherwise back off exponentially with jitter."""
+    error = retry_state.outcome.exception()
+    if isinstance(error, RateLimitError):
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), _MAX_BACKOFF_SECONDS)
+    return _backoff(retry_state)
+
+
+def _extract_fenced_block(content: str) -> Optional[str]:
+    """Return the body of the first ```/```json fenced block, stripped.
+
+    Plain substring scans instead of a lazy regex, so responses without a
+    fence cost one find() and unterminated fences can't trigger backtracking.
+    """
+    start = content.find("```")
+    if start == -1:
+        return None
+    body_start = start + 3
+    if content.startswith("json", body_start):
+        body_start += 4
+    end = content.find("```", body_start)
+    if end == -1:
+        # Unterminated, e.g. the stream was closed once the JSON was complete
+        return content[body_start:].strip()
+    return content[body_start:end].strip()
+
+
+def _is_json(parts: List[str], span: Tuple[int, int]) -> bool:
+    try:
+        orjson.loads("".join(parts)[span[0]:span[1]])
+    except orjson.JSONDecodeError:
+        return False
+    return True
+
+
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+
+class _JsonObjectEnd:
+    """Detect, across streamed deltas, when a response's JSON object closes.
+
+    Only responses that open with the object (bare or inside a ``` / ```json
+    fence) are tracked; anything else never reports an end, so prose with
+    stray braces can't cut a response short. Brace depth is tracked outside
+    string literals, scanning only braces, quotes and backslashes.
+    """
+
+    _OPENERS = ("", "```", "```json")
+
+    def __init__(self):
+        self._prefix = ""
+        self._started = False
+        self._disabled = False
+        self._depth = 0
+        self._in_string = False
+        self._escape_pending = False
+        self._offset = 0
+        self._start = 0
+
+    def feed(self, text: str) -> Optional[Tuple[int, int]]:
+        """Return the (start, end) offsets of the object once it closes."""
+        if self._disabled:
+            return None
+        offset = self._offset
+        self._offset += len(text)
+        # Position of a character escaped by a preceding backslash
+        skip_at = 0 if self._escape_pending else -1
+        self._escape_pending = False
+        for match in _JSON_TOKEN_RE.finditer(text):
+            pos = match.start()
+            if pos == skip_at:
+                continue
+            char = match.group()
+            if not self._started:
+                if char != "{" or (self._prefix + text[:pos]).strip() not in self._OPENERS:
+                    self._disabled = True
+                    return None
+                self._started = True
+                self._start = offset + pos
+                self._depth = 1
+            elif self._in_string:
+                if char == "\\":
+                    skip_at = pos + 1
+                    self._escape_pending = skip_at == len(text)
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._disabled = True
+                    return (self._start, offset + pos + 1)
+        if not self._started:
+            self._prefix += text
+            if len(self._prefix) > 16:
+                self._disabled = True
+        return None
+
 
 class AkashMLClient:
     """OpenAI-compatible client for AkashML inference with proper error handling."""
@@ -30,6 +175,7 @@ class AkashMLClient:
         "standard": "meta-llama/Llama-3.3-70B-Instruct",
         "quick": "Qwen/Qwen3-30B-A3B"
     }
+    DEPTH_ORDER = ("quick", "standard", "deep")
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("AKASHML_API_KEY") or settings.akashml_api_key
@@ -37,42 +183,115 @@ class AkashMLClient:
             raise ValueError("AKASHML_API_KEY is required")
 
         base_url = settings.akashml_base_url or "https://api.akashml.com/v1"
-        self.client = OpenAI(
+        # Retries are handled by tenacity in _open_stream; SDK retries on top
+        # of those would multiply the attempts per call
+        self.client = AsyncOpenAI(
             api_key=self.api_key,
             base_url=base_url,
-            timeout=self.TIMEOUT
+            timeout=self.TIMEOUT,
+            max_retries=0
         )
-        logger.info(f"AkashML client initialized with {self.TIMEOUT}s timeout")
+        # Caps in-flight requests so concurrent audits stay under provider rate
+        # limits; the cap shrinks while the provider returns 429s/5xx
+        self._limiter = AdaptiveConcurrencyLimiter(settings.max_concurrent_llm)
+        self._prompt_cache = PromptCache(max_entries=settings.cache_max_entries)
+        # Resolved once; unknown depths fall back to the configured default model
+        self._model_for: Dict[str, str] = dict(self.MODELS)
+        self._fallback_model: str = settings.default_model or self.MODELS["standard"]
+        logger.info(
+            f"AkashML client initialized with {self.TIMEOUT}s timeout, "
+            f"max {settings.max_concurrent_llm} concurrent requests"
+        )
+
+    def route_depth(self, parsed_diff: ParsedDiff, depth: str) -> str:
+        """Pick the cheapest depth that suits the diff, never above the given depth.
 
-    def analyze(
+        Small diffs gain little from the larger models but pay their slower decode.
+        """
+        complexity = (
+            parsed_diff.total_additions
+            + parsed_diff.total_deletions
+            + len(parsed_diff.languages) * 5
+        )
+        if complexity < 30:
+            routed = "quick"
+        elif complexity < 150:
+            routed = "standard"
+        else:
+            routed = "deep"
+        if depth not in self.DEPTH_ORDER:
+            return depth
+        return min(depth, routed, key=self.DEPTH_ORDER.index)
+
+    async def analyze(
         self,
         prompt: str,
         system_prompt: str = None,
         depth: str = "standard",
         temperature: float = 0.1,
-        max_tokens: int = 4096
+        max_tokens: int = 4096,
+        stop_at_json_end: bool = False
     ) -> Dict[str, Any]:
-        """Execute analysis with AkashML with proper error handling."""
-        model = self.MODELS.get(depth) or settings.default_model or self.MODELS["standard"]
+        """Execute analysis with AkashML with proper error handling.
+
+        With stop_at_json_end, the stream is closed as soon as the first
+        top-level JSON object in the output is complete, so trailing text
+        isn't generated. Token usage arrives on the final chunk, so when the
+        stream is cut short (early JSON stop or size cap) prompt_tokens and
+        completion_tokens are None: unknown, not zero.
+
+        Responses are not cached here: a complete response carries a
+        "cache_key", and the caller passes it to cache_response once the
+        content has parsed, so unusable replies are never pinned.
+        """
+        model = self._model_for.get(depth, self._fallback_model)
 
         if system_prompt is None:
-            system_prompt = self._get_default_system_prompt()
+            system_prompt = _DEFAULT_SYSTEM_PROMPT
+
+        cache_key = self._prompt_cache.key(model, system_prompt, prompt, temperature, max_tokens)
+        cached = self._prompt_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Prompt cache hit for model={model}, depth={depth}")
+            return dict(cached)  # Stored without cache_key, so hits aren't re-cached
 
         logger.info(f"Starting analysis with model={model}, depth={depth}")
         logger.debug(f"Prompt length: {len(prompt)} chars")
 
+        # Failures while opening were already retried by tenacity, so only
+        # transient errors after the stream opened are retryable for callers
+        opened = False
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-
-            content = response.choices[0].message.content if response.choices else None
+            parts = []
+            size = 0
+            truncated = False
+            usage_info = None
+            json_end = _JsonObjectEnd() if stop_at_json_end else None
+            stream = await self._open_stream(model, system_prompt, prompt, temperature, max_tokens)
+            opened = True
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        usage_info = chunk.usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    size += len(delta)
+                    # Stop reading (and close the stream) once over the size cap
+                    # instead of buffering the whole oversized response first
+                    if size > self.MAX_RESPONSE_SIZE:
+                        truncated = True
+                        break
+                    if json_end is not None:
+                        span = json_end.feed(delta)
+                        if span is not None and _is_json(parts, span):
+                            logger.debug("JSON object complete, closing stream early")
+                            break
+            finally:
+                await self._close_stream(stream)
+
+            content = "".join(parts)
             if not content:
                 logger.warning("Empty response from model")
                 return {
@@ -85,23 +304,30 @@ class AkashMLClient:
                 }
 
             # Truncate oversized responses to prevent memory issues
-            if len(content) > self.MAX_RESPONSE_SIZE:
-                logger.warning(f"Response too large ({len(content)} chars), truncating to {self.MAX_RESPONSE_SIZE}")
+            if truncated:
+                logger.warning(f"Response too large (>{self.MAX_RESPONSE_SIZE} chars), truncating to {self.MAX_RESPONSE_SIZE}")
                 content = content[:self.MAX_RESPONSE_SIZE]
 
             usage = {
-                "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
-                "completion_tokens": response.usage.completion_tokens if response.usage else 0
+                "prompt_tokens": usage_info.prompt_tokens if usage_info else None,
+                "completion_tokens": usage_info.completion_tokens if usage_info else None
             }
 
-            logger.info(f"Analysis completed: {usage['completion_tokens']} tokens generated")
+            if usage_info:
+                logger.info(f"Analysis completed: {usage['completion_tokens']} tokens generated")
+            else:
+                logger.info("Analysis completed: stream closed early, token usage unknown")
 
-            return {
+            result = {
                 "content": content,
                 "model": model,
                 "usage": usage,
                 "success": True
             }
+            # Only complete responses can be cached; truncations stay retryable
+            if not truncated:
+                result["cache_key"] = cache_key
+            return result
 
         except APITimeoutError as e:
             logger.error(f"AkashML API timeout after {self.TIMEOUT}s")
@@ -110,7 +336,7 @@ class AkashMLClient:
                 "error": "API request timed out. Please try again.",
                 "error_type": "timeout",
                 "model": model,
-                "retryable": True,
+                "retryable": opened,
                 "success": False
             }
 
@@ -121,7 +347,7 @@ class AkashMLClient:
                 "error": "Rate limited. Please wait before retrying.",
                 "error_type": "rate_limit",
                 "model": model,
-                "retryable": True,
+                "retryable": opened,
                 "success": False
             }
 
@@ -143,18 +369,20 @@ class AkashMLClient:
                 "error": "Cannot connect to AkashML API. Check network.",
                 "error_type": "connection",
                 "model": model,
-                "retryable": True,
+                "retryable": opened,
                 "success": False
             }
 
         except APIError as e:
-            logger.error(f"API error: {e.status_code} - {e}")
+            # An error event mid-stream raises a bare APIError with no status
+            status = getattr(e, "status_code", None)
+            logger.error("API error: %s - %s", status, e)
             return {
                 "content": None,
-                "error": f"API error ({e.status_code}): {str(e)[:100]}",
+                "error": f"API error ({status}): {str(e)[:100]}",
                 "error_type": "api_error",
                 "model": model,
-                "retryable": e.status_code >= 500,  # Retry on server errors
+                "retryable": status is None or status >= 500,  # Retry on server errors
                 "success": False
             }
 
@@ -169,16 +397,101 @@ class AkashMLClient:
                 "success": False
             }
 
-    def _get_default_system_prompt(self) -> str:
-        return """You are an expert code auditor specializing in:
-- Security vulnerability detection (OWASP Top 10, CWE patterns)
-- Code quality assessment
-- Performance analysis
-- Best practices review
+    @contextlib.asynccontextmanager
+    async def analyze_stream(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        depth: str = "standard",
+        temperature: float = 0.1,
+        max_tokens: int = 4096
+    ) -> AsyncIterator[AsyncIterator[str]]:
+        """Open a completion and yield an iterator over its text as it arrives.
 
-Provide evidence-backed findings with specific line numbers, clear explanations,
-and actionable fixes. Do not include chain-of-thought; output only final
-answers in valid JSON when requested."""
+        Use as `async with client.analyze_stream(prompt) as deltas:`. Leaving
+        the block closes the stream and frees its concurrency slot, even if
+        iteration stopped early. Unlike analyze, API errors are raised as
+        OpenAI exceptions.
+        """
+        model = self._model_for.get(depth, self._fallback_model)
+
+        if system_prompt is None:
+            system_prompt = _DEFAULT_SYSTEM_PROMPT
+
+        stream = await self._open_stream(model, system_prompt, prompt, temperature, max_tokens)
+        try:
+            yield self._iter_deltas(stream)
+        finally:
+            await self._close_stream(stream)
+
+    @staticmethod
+    async def _iter_deltas(stream: Any) -> AsyncIterator[str]:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def _close_stream(self, stream: Any) -> None:
+        """Close a stream from _open_stream and free its concurrency slot."""
+        try:
+            # Releases the connection, which also stops generation on early exit
+            await stream.close()
+        finally:
+            self._limiter.release()
+
+    @retry(
+        retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+        wait=_wait_before_retry,
+        stop=stop_after_attempt(4),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    async def _open_stream(
+        self,
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Any:
+        """Open a completion stream, retrying transient failures.
+
+        Only opening the stream is retried; an error mid-stream would otherwise
+        duplicate output already read. After the last attempt the error is
+        re-raised for analyze to map into its error dict.
+
+        Each attempt takes its own limiter slot and gives it back on failure, so
+        backoff sleeps don't hold one. A returned stream keeps its slot until
+        passed to _close_stream.
+        """
+        await self._limiter.acquire()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        except BaseException as e:
+            if isinstance(e, APIStatusError) and (isinstance(e, RateLimitError) or e.status_code >= 500):
+                self._limiter.record_overload()
+            self._limiter.release()
+            raise
+        self._limiter.record_success()
+        return stream
+
+    async def cache_response(self, response: Dict[str, Any]) -> None:
+        """Cache a response from analyze; call only once its content has parsed."""
+        cache_key = response.get("cache_key")
+        if cache_key is None or not response.get("success"):
+            return
+        entry = {k: v for k, v in response.items() if k != "cache_key"}
+        await self._prompt_cache.set(cache_key, entry, settings.cache_ttl_seconds)
 
     def parse_json_response(self, content: str) -> Dict[str, Any]:
         """Parse JSON from LLM response with robust error handling.
@@ -207,21 +520,21 @@ answers in valid JSON when requested."""
             }
 
         # Try to extract JSON from markdown code blocks
-        json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', content)
-        if json_match:
+        block = _extract_fenced_block(content)
+        if block is not None:
             try:
-                result = json.loads(json_match.group(1))
+                result = orjson.loads(block)
                 result["parse_success"] = True
                 return result
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.warning(f"JSON parse failed in markdown block: {e}")
 
         # Try direct JSON parse
         try:
-            result = json.loads(content)
+            result = orjson.loads(content)
             result["parse_success"] = True
             return result
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Cannot parse LLM response as JSON: {e}")
             logger.debug(f"Raw content preview: {content[:300]}")
             return {
@@ -232,7 +545,7 @@ answers in valid JSON when requested."""
                 "raw_preview": content[:500]
             }
 
-    def fix_json(self, malformed_content: str) -> Dict[str, Any]:
+    async def fix_json(self, malformed_content: str) -> Dict[str, Any]:
         """
         Attempt to fix malformed JSON using LLM.
         Returns { success: bool, fixed_json: dict | None, error: str | None }
@@ -240,14 +553,24 @@ answers in valid JSON when requested."""
         if not malformed_content or len(malformed_content.strip()) < 10:
             return {"success": False, "error": "Content too short to repair"}
 
-        from app.prompts.templates import FIX_JSON_PROMPT
+        from app.prompts.templates import render_fix_json_prompt
+
+        # Send only the outermost {...} span; surrounding prose is just extra prefill
+        start = malformed_content.find("{")
+        end = malformed_content.rfind("}")
+        if start != -1 and end > start:
+            malformed_content = malformed_content[start:end + 1]
 
-        prompt = FIX_JSON_PROMPT.format(content=malformed_content[:2000])
+        prompt = render_fix_json_prompt(malformed_content[:2000])
 
-        response = self.analyze(
+        # Repair is a mechanical task, so use the smallest model. Identical
+        # repairs are served from the prompt cache.
+        response = await self.analyze(
             prompt=prompt,
+            depth="quick",
             temperature=0.0,
-            max_tokens=2048
+            max_tokens=2048,
+            stop_at_json_end=True
         )
 
         if response.get("error") or not response.get("success"):
@@ -261,6 +584,7 @@ answers in valid JSON when requested."""
         parsed = self.parse_json_response(content)
 
         if parsed.get("parse_success"):
+            await self.cache_response(response)
             return {
                 "success": True,
                 "fixed_json": parsed,
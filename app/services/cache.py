@@ -1,40 +1,191 @@
-"""Simple in-memory cache with TTL for audit results."""
+"""LRU caches with TTL for audit results and LLM responses, with an optional SQLite tier."""
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Busy timeout for SQLite reads on the event loop; a locked read is a miss
+_READ_TIMEOUT_SECONDS = 0.05
 
 
 class InMemoryCache:
-    """Async-safe in-memory TTL cache."""
+    """Async-safe in-memory LRU cache with per-entry TTL.
+
+    Expiry uses the monotonic clock, so wall-clock jumps don't shorten or extend TTLs.
+    """
 
     def __init__(self, max_entries: int = 512):
-        self._store: Dict[str, Dict[str, Any]] = {}
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._store: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
         self._lock = asyncio.Lock()
         self._max_entries = max_entries
 
-    async def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str) -> Optional[Any]:
+        # Lock-free: this never awaits, so it runs atomically on the event loop
+        # and can't interleave with the locked section of set()
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._store.pop(key, None)
+            return None
+        self._store.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
         async with self._lock:
-            entry = self._store.get(key)
-            if not entry:
-                return None
-            if entry["expires_at"] <= time.time():
-                self._store.pop(key, None)
-                return None
-            return entry["value"]
-
-    async def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+            self.set_nowait(key, value, ttl_seconds)
+
+    def set_nowait(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Synchronous set for callers already on the event loop (never awaits)."""
         if ttl_seconds <= 0 or self._max_entries <= 0:
             return
-        expires_at = time.time() + ttl_seconds
-        async with self._lock:
-            if len(self._store) >= self._max_entries:
-                self._evict_oldest()
-            self._store[key] = {"value": value, "expires_at": expires_at, "created_at": time.time()}
+        expires_at = time.monotonic() + ttl_seconds
+        if key in self._store:
+            self._store.move_to_end(key)
+        elif len(self._store) >= self._max_entries:
+            self._store.popitem(last=False)
+        self._store[key] = (expires_at, value)
+
 
-    def _evict_oldest(self) -> None:
-        if not self._store:
+class TieredCache:
+    """InMemoryCache backed by a SQLite file that survives restarts.
+
+    The memory tier stays the hot path; SQLite catches cold starts and is
+    shared by every worker process pointed at the same file. Entries expire
+    on the wall clock there, since monotonic time doesn't survive a restart.
+    Values must be JSON-serializable. SQLite errors and corrupt rows are logged
+    and treated as misses so the cache never fails a request.
+
+    Reads run on the event loop with a short busy timeout (WAL readers rarely
+    wait at all); writes, which can queue behind other workers' write locks,
+    run in a thread on their own connection.
+    """
+
+    def __init__(self, path: str, max_entries: int = 512):
+        self._memory = InMemoryCache(max_entries=max_entries)
+        # Created at import but used from the event loop thread; reads run to
+        # completion without awaiting, so access is never concurrent
+        self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=_READ_TIMEOUT_SECONDS
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        # Used only from worker threads, one write at a time
+        self._write_db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._write_db.execute("PRAGMA synchronous=NORMAL")
+        self._write_lock = asyncio.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache read failed: %s", e)
+            return None
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return None
+        try:
+            value = orjson.loads(row[0])
+        except orjson.JSONDecodeError as e:
+            logger.warning("Dropping corrupt SQLite cache entry: %s", e)
+            self._discard(key)
+            return None
+        # Promote so repeat hits stay in memory, keeping the original expiry
+        self._memory.set_nowait(key, value, remaining)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        await self._memory.set(key, value, ttl_seconds)
+        try:
+            payload = orjson.dumps(value)
+        except TypeError as e:
+            logger.warning("SQLite cache write skipped, value not serializable: %s", e)
             return
-        oldest_key = min(self._store.items(), key=lambda item: item[1]["created_at"])[0]
-        self._store.pop(oldest_key, None)
+        try:
+            async with self._write_lock:
+                await asyncio.to_thread(self._write, key, payload, ttl_seconds)
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache write failed: %s", e)
+
+    def _write(self, key: str, payload: bytes, ttl_seconds: float) -> None:
+        now = time.time()
+        self._write_db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, payload, now + ttl_seconds)
+        )
+        self._write_db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def _discard(self, key: str) -> None:
+        try:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache delete failed: %s", e)
+
+    def close(self) -> None:
+        self._db.close()
+        self._write_db.close()
+
+
+# Per-commit noise in diff prompts that doesn't change what the model is asked
+_INDEX_LINE_RE = re.compile(r"^index [0-9a-f]+\.\.[0-9a-f]+(?: [0-7]+)?\n", re.MULTILINE)
+_TRAILING_WS_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+
+
+def normalize_prompt(text: str) -> str:
+    """Drop blob-hash index lines, CRLFs and trailing whitespace from a prompt."""
+    text = text.replace("\r\n", "\n")
+    text = _INDEX_LINE_RE.sub("", text)
+    return _TRAILING_WS_RE.sub("", text)
+
+
+class PromptCache:
+    """Cache of LLM responses keyed by normalized prompt and sampling parameters.
+
+    Re-submitted diffs that differ only in blob hashes or whitespace reuse the
+    earlier response. File paths and hunk content stay in the key, so a hit
+    always means the model saw the same code.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self._cache = InMemoryCache(max_entries=max_entries)
+
+    @staticmethod
+    def key(model: str, system_prompt: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{model}\0{temperature!r}\0{max_tokens}\0".encode())
+        hasher.update(normalize_prompt(system_prompt).encode())
+        hasher.update(b"\0")
+        hasher.update(normalize_prompt(prompt).encode())
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, response: Dict[str, Any], ttl_seconds: int) -> None:
+        await self._cache.set(key, response, ttl_seconds)
@@ -1,7 +1,10 @@
 """Git diff parser for extracting structured information."""
+import os
 import re
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Optional, Set
+from functools import cached_property
+from typing import Callable, Iterable, Iterator, List, Optional, Set, TextIO
 
 
 @dataclass
@@ -11,14 +14,50 @@ class DiffHunk:
     old_count: int
     new_start: int
     new_count: int
-    content: str
-    additions: List[str] = field(default_factory=list)
-    deletions: List[str] = field(default_factory=list)
+    # Added/removed lines are stored as indices into the body lines rather than
+    # as separate string copies; counts are a len() on a compact typed array.
+    # These are buffers and memos, so they stay out of the generated __eq__.
+    add_indices: array = field(default_factory=lambda: array('I'), init=False, repr=False, compare=False)
+    del_indices: array = field(default_factory=lambda: array('I'), init=False, repr=False, compare=False)
+    _lines: List[str] = field(default_factory=list, init=False, repr=False, compare=False)
+    _content: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def add_line(self, line: str) -> None:
+        """Buffer a body line; content is joined once on first access."""
+        marker = line[:1]
+        if marker == '+':
+            if not line.startswith('+++'):
+                self.add_indices.append(len(self._lines))
+        elif marker == '-':
+            if not line.startswith('---'):
+                self.del_indices.append(len(self._lines))
+        self._lines.append(line)
+        self._content = None
+
+    @property
+    def additions(self) -> List[str]:
+        lines = self._lines
+        return [lines[i][1:] for i in self.add_indices]
+
+    @property
+    def deletions(self) -> List[str]:
+        lines = self._lines
+        return [lines[i][1:] for i in self.del_indices]
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = '\n'.join(self._lines) + '\n' if self._lines else ""
+        return self._content
 
 
 @dataclass
 class DiffFile:
-    """Represents a single file in a diff."""
+    """Represents a single file in a diff.
+
+    Aggregates are computed on first access; the parser finishes populating
+    hunks before returning, so they are not invalidated afterwards.
+    """
     old_path: str
     new_path: str
     hunks: List[DiffHunk] = field(default_factory=list)
@@ -26,13 +65,13 @@ class DiffFile:
     is_deleted: bool = False
     language: Optional[str] = None
 
-    @property
+    @cached_property
     def additions(self) -> int:
-        return sum(len(h.additions) for h in self.hunks)
+        return sum(len(h.add_indices) for h in self.hunks)
 
-    @property
+    @cached_property
     def deletions(self) -> int:
-        return sum(len(h.deletions) for h in self.hunks)
+        return sum(len(h.del_indices) for h in self.hunks)
 
 
 @dataclass
@@ -41,15 +80,15 @@ class ParsedDiff:
     files: List[DiffFile] = field(default_factory=list)
     raw_content: str = ""
 
-    @property
+    @cached_property
     def total_additions(self) -> int:
         return sum(f.additions for f in self.files)
 
-    @property
+    @cached_property
     def total_deletions(self) -> int:
         return sum(f.deletions for f in self.files)
 
-    @property
+    @cached_property
     def languages(self) -> Set[str]:
         return {f.language for f in self.files if f.language}
 
@@ -61,6 +100,7 @@ class ParsedDiff:
 class DiffParser:
     """Parser for unified diff format."""
 
+    # Keys are lowercase; lookups lowercase the extension
     LANGUAGE_MAP = {
         '.py': 'python',
         '.js': 'javascript',
@@ -88,10 +128,20 @@ class DiffParser:
 
     # Patterns for parsing diff headers
     # Handles both quoted paths (spaces) and unquoted paths
-    FILE_HEADER_QUOTED = re.compile(r'^diff --git "a/(.+)" "b/(.+)"$')
-    FILE_HEADER_UNQUOTED = re.compile(r'^diff --git a/(.+) b/(.+)$')
+    FILE_HEADER = re.compile(
+        r'^diff --git (?:"a/(?P<qa>.+)" "b/(?P<qb>.+)"|a/(?P<ua>.+?) b/(?P<ub>.+))$'
+    )
     HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
 
+    # Every line kind parse() cares about, so each line costs a single match
+    LINE_RE = re.compile(
+        r'(?P<header>diff --git )'
+        r'|(?P<hunk>@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@)'
+        r'|(?P<new_file>new file mode)'
+        r'|(?P<deleted_file>deleted file mode)'
+    )
+    HEADER_STARTS = frozenset('d@n')
+
     def _parse_file_header(self, line: str) -> Optional[tuple]:
         """Parse file paths from diff header, handling spaces in filenames.
 
@@ -101,129 +151,127 @@ class DiffParser:
 
         For unquoted paths with spaces, we use heuristics to find the split point.
         """
-        # Try quoted format first (handles spaces definitively)
-        match = self.FILE_HEADER_QUOTED.match(line)
-        if match:
-            return match.groups()
+        if not line.startswith("diff --git "):
+            return None
 
-        # Try unquoted format
-        match = self.FILE_HEADER_UNQUOTED.match(line)
+        match = self.FILE_HEADER.match(line)
         if not match:
             return None
 
-        # For unquoted, the regex is greedy. We need to find the correct split.
-        # The pattern "a/X b/X" means both paths should be identical or similar.
-        # Strategy: find " b/" and check if paths before/after are equal
-        prefix = "diff --git a/"
-        if not line.startswith(prefix):
-            return None
+        # Quoted paths are unambiguous
+        if match.group('qa') is not None:
+            return match.group('qa', 'qb')
 
-        remainder = line[len(prefix):]
+        # Unquoted: the lazy match takes the earliest " b/" split, which is the
+        # right one whenever both sides agree (the common a/foo b/foo case)
+        old_path, new_path = match.group('ua', 'ub')
+        if old_path == new_path:
+            return (old_path, new_path)
 
-        # Look for " b/" separator - try to find where old_path ends and new_path starts
-        # Most common case: paths are identical (a/foo.py b/foo.py)
+        # Otherwise look for a later split where the paths are identical
+        remainder = line[len("diff --git a/"):]
         split_marker = " b/"
-        if split_marker not in remainder:
-            return match.groups()  # Fallback to greedy match
-
-        # Find all possible split points
-        idx = 0
         candidates = []
+        idx = 0
         while True:
             pos = remainder.find(split_marker, idx)
             if pos == -1:
                 break
-            old_path = remainder[:pos]
-            new_path = remainder[pos + len(split_marker):]
-            candidates.append((old_path, new_path))
+            candidates.append((remainder[:pos], remainder[pos + len(split_marker):]))
             idx = pos + 1
 
-        if not candidates:
-            return match.groups()
-
-        # Prefer split where paths are identical (most common case)
         for old_path, new_path in candidates:
             if old_path == new_path:
                 return (old_path, new_path)
 
-        # If no identical match, prefer shortest valid paths (handles renames)
-        # Return first candidate as it's most likely correct for renames
+        # If no identical match, the first split is most likely correct for renames
         return candidates[0]
 
     def parse(self, diff_content: str) -> ParsedDiff:
         """Parse a unified diff into structured format."""
-        result = ParsedDiff(raw_content=diff_content)
-
         if not diff_content.strip():
-            return result
+            return ParsedDiff(raw_content=diff_content)
 
-        lines = diff_content.split('\n')
-        current_file: Optional[DiffFile] = None
-        current_hunk: Optional[DiffHunk] = None
+        # A str is already in memory, and hunks keep every line anyway, so one
+        # split is cheaper than streaming it through a StringIO
+        result = self._parse_lines(diff_content.split('\n'))
+        result.raw_content = diff_content
+        return result
+
+    def parse_stream(self, stream: TextIO) -> ParsedDiff:
+        """Parse a unified diff from a text stream, one line at a time.
 
+        Lets large diffs be parsed straight from a file handle without first
+        reading them into a string; raw_content is left empty.
+        """
+        return self._parse_lines(self._iter_lines(stream))
+
+    def _parse_lines(self, lines: Iterable[str]) -> ParsedDiff:
+        result = ParsedDiff()
+        current_file: Optional[DiffFile] = None
+        current_hunk: DiffHunk
+        # Bound add_line of the open hunk, so body lines skip the attribute lookup
+        add_line: Optional[Callable[[str], None]] = None
+        # Local alias avoids a class attribute lookup per line in the hot loop
+        match_line = self.LINE_RE.match
+        header_starts = self.HEADER_STARTS
+
+        line: str
         for line in lines:
-            # Check for file header
-            file_paths = self._parse_file_header(line)
-            if file_paths:
-                if current_file:
-                    if current_hunk:
-                        current_file.hunks.append(current_hunk)
-                    result.files.append(current_file)
-
-                old_path, new_path = file_paths
-                current_file = DiffFile(
-                    old_path=old_path,
-                    new_path=new_path,
-                    language=self._detect_language(new_path)
-                )
-                current_hunk = None
-                continue
-
-            # Check for hunk header
-            hunk_match = self.HUNK_HEADER.match(line)
-            if hunk_match and current_file:
-                if current_hunk:
+            # Only lines starting with one of LINE_RE's first characters can be
+            # headers; +/-/context lines go straight to the hunk without a regex
+            line_match = match_line(line) if line[:1] in header_starts else None
+            if line_match:
+                kind = line_match.lastgroup
+                if kind == 'header':
+                    file_paths = self._parse_file_header(line)
+                    if file_paths:
+                        old_path, new_path = file_paths
+                        current_file = DiffFile(
+                            old_path=old_path,
+                            new_path=new_path,
+                            language=self._detect_language(new_path)
+                        )
+                        result.files.append(current_file)
+                        add_line = None
+                        continue
+
+                elif kind == 'hunk' and current_file:
+                    current_hunk = DiffHunk(
+                        old_start=int(line_match.group('old_start')),
+                        old_count=int(line_match.group('old_count') or 1),
+                        new_start=int(line_match.group('new_start')),
+                        new_count=int(line_match.group('new_count') or 1)
+                    )
                     current_file.hunks.append(current_hunk)
+                    add_line = current_hunk.add_line
+                    continue
 
-                groups = hunk_match.groups()
-                current_hunk = DiffHunk(
-                    old_start=int(groups[0]),
-                    old_count=int(groups[1] or 1),
-                    new_start=int(groups[2]),
-                    new_count=int(groups[3] or 1),
-                    content=""
-                )
-                continue
-
-            # Process hunk content
-            if current_hunk:
-                current_hunk.content += line + '\n'
-                if line.startswith('+') and not line.startswith('+++'):
-                    current_hunk.additions.append(line[1:])
-                elif line.startswith('-') and not line.startswith('---'):
-                    current_hunk.deletions.append(line[1:])
-
-            # Check for new/deleted file
-            if current_file:
-                if line.startswith('new file mode'):
+                elif kind == 'new_file' and current_file:
                     current_file.is_new = True
-                elif line.startswith('deleted file mode'):
+                elif kind == 'deleted_file' and current_file:
                     current_file.is_deleted = True
 
-        # Add final file and hunk
-        if current_hunk and current_file:
-            current_file.hunks.append(current_hunk)
-        if current_file:
-            result.files.append(current_file)
+            # Process hunk content
+            if add_line is not None:
+                add_line(line)
 
         return result
 
+    @staticmethod
+    def _iter_lines(stream: TextIO) -> Iterator[str]:
+        """Yield lines without their newline, matching str.split('\\n')."""
+        line = ""
+        for line in stream:
+            yield line[:-1] if line.endswith('\n') else line
+        # split('\n') yields a trailing empty piece after a final newline
+        if not line or line.endswith('\n'):
+            yield ""
+
     def _detect_language(self, filepath: str) -> Optional[str]:
         """Detect programming language from file extension."""
-        for ext, lang in self.LANGUAGE_MAP.items():
-            if filepath.endswith(ext):
-                return lang
-        return None
+        _, ext = os.path.splitext(filepath)
+        return self.LANGUAGE_MAP.get(ext.lower())
 
     def get_summary(self, parsed: ParsedDiff) -> str:
         """Generate a human-readable summary of the diff."""
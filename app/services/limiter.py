@@ -0,0 +1,81 @@
+"""Adaptive concurrency limit for outbound LLM calls."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Async context manager bounding in-flight calls with an AIMD limit.
+
+    The limit starts at max_limit. An overload signal (429 or 5xx) halves it,
+    but only if a call was admitted since the previous decrease, so a burst of
+    failures from calls already in flight counts once. Every `limit`
+    consecutive successes raise it by one.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self._max_limit = max(1, max_limit)
+        self._min_limit = max(1, min(min_limit, self._max_limit))
+        self._limit = self._max_limit
+        self._in_flight = 0
+        self._successes = 0
+        # Admission counter, and its value at the last decrease
+        self._started = 0
+        self._decreased_at = 0
+        self._waiters: List[asyncio.Future] = []
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def __aenter__(self) -> AdaptiveConcurrencyLimiter:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot and take it."""
+        while self._in_flight >= self._limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+        self._started += 1
+
+    def release(self) -> None:
+        """Give a slot back. Synchronous, so it can't be lost to a cancellation."""
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # Every waiter re-checks the limit, so waking all of them never loses a slot
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def record_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self._limit and self._limit < self._max_limit:
+            self._limit += 1
+            self._successes = 0
+            self._wake_waiters()
+            logger.debug("LLM concurrency limit raised to %s", self._limit)
+
+    def record_overload(self) -> None:
+        self._successes = 0
+        if self._started <= self._decreased_at or self._limit == self._min_limit:
+            return
+        self._limit = max(self._min_limit, self._limit // 2)
+        self._decreased_at = self._started
+        logger.warning("Provider overloaded, LLM concurrency limit lowered to %s", self._limit)
@@ -1,15 +1,77 @@
 """Evidence-first orchestrator for multi-audit analysis."""
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
-import json
+import hashlib
 import logging
+import random
+import zlib
+
+import orjson
 
 from app.services.akashml_client import AkashMLClient
+from app.services.cache import InMemoryCache
+from app.services.diff_parser import ParsedDiff
 from app.config import settings
-from app.prompts.templates import AUDIT_PROMPTS, SYNTHESIS_PROMPT
+from app.prompts.templates import (
+    AUDIT_PROMPTS,
+    render_combined_prompt,
+    render_prompt,
+    render_synthesis_prompt
+)
 
 logger = logging.getLogger(__name__)
 
+# Prose-only extensions eligible for the opt-in docs-only shortcut. .txt is
+# left out: requirements.txt, constraints.txt and CMakeLists.txt are code.
+DOC_EXTENSIONS = (".md", ".rst")
+
+# Line prefixes that start a file diff and a hunk
+_FILE_HEADER = "diff --git "
+_HUNK_HEADER = "@@ "
+
+# A hunk body or file header line is a content-defined cut point with probability 1/4
+_CUT_MASK = 0x3
+
+# Output budget for one audit's findings; combined prompts get one per audit
+AUDIT_MAX_TOKENS = 4096
+
+# Per-finding description budget in the synthesis prompt
+SYNTHESIS_DESCRIPTION_CHARS = 200
+
+# Findings per audit sent to synthesis, most severe first
+SYNTHESIS_TOP_FINDINGS = 3
+_SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def _line_offsets(text: str, marker: str) -> List[int]:
+    """Offsets of every line in text that starts with marker.
+
+    Found with str.find on a literal, so the scan is linear in the diff size
+    whatever its contents.
+    """
+    offsets = [0] if text.startswith(marker) else []
+    needle = "\n" + marker
+    pos = text.find(needle)
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = text.find(needle, pos + len(needle))
+    return offsets
+
+
+def _split_before(text: str, marker: str) -> List[str]:
+    """Split text before every line that starts with marker.
+
+    Like re.split on (?m)^(?=marker), the first part is whatever precedes the
+    first marker line (possibly empty) and the parts join back to text.
+    """
+    offsets = _line_offsets(text, marker)
+    parts = [text[:offsets[0]]] if offsets else [text]
+    for start, end in zip(offsets, offsets[1:] + [len(text)]):
+        parts.append(text[start:end])
+    return parts
+
 
 class AuditOrchestrator:
     """Orchestrates multiple audit passes with evidence-backed outputs."""
@@ -22,56 +84,129 @@ class AuditOrchestrator:
         "best_practices": 0.15
     }
 
-    def __init__(self, akashml_client: AkashMLClient):
+    def __init__(self, akashml_client: AkashMLClient, cache: Optional[InMemoryCache] = None):
         self.client = akashml_client
+        # Per-audit results keyed by diff content, so repeated chunks and
+        # re-runs skip the LLM call and response parsing
+        self.cache = cache
 
     async def run_full_audit(
         self,
         diff_content: str,
         selected_audits: Optional[List[str]] = None,
-        depth: str = "standard"
+        depth: Optional[str] = None,
+        parsed_diff: Optional[ParsedDiff] = None
     ) -> Dict[str, Any]:
-        """Run comprehensive audit with all selected auditors."""
-        audits_to_run = selected_audits or list(AUDIT_PROMPTS.keys())
+        """Run comprehensive audit with all selected auditors.
+
+        An explicit depth is always honoured. When depth is None it defaults to
+        "standard", and with parsed_diff and DEPTH_ROUTING small diffs are routed
+        to a cheaper depth. The depth actually used is returned under "depth".
+        """
+        requested = selected_audits or list(AUDIT_PROMPTS.keys())
+        # Filter once up front; dict.fromkeys also drops repeats, which would
+        # otherwise run the same audit twice and overwrite its result
+        audit_types = [a for a in dict.fromkeys(requested) if a in AUDIT_PROMPTS]
+        if len(audit_types) < len(requested):
+            logger.debug(
+                f"Skipping unknown or repeated audit types: requested {requested}, running {audit_types}"
+            )
+
+        if parsed_diff is not None and settings.docs_only_shortcut and self._is_docs_only(parsed_diff):
+            logger.info("Diff touches only documentation files, skipping LLM audits")
+            return self._docs_only_result(audit_types)
+
+        if depth is None:
+            depth = "standard"
+            if parsed_diff is not None and settings.depth_routing:
+                routed = self.client.route_depth(parsed_diff, depth)
+                if routed != depth:
+                    logger.info(f"Routing depth {depth} -> {routed} for small diff")
+                    depth = routed
+
         diff_chunks = self._chunk_diff(diff_content)
         if len(diff_chunks) > 1:
             logger.info(f"Chunking diff into {len(diff_chunks)} parts for analysis")
 
         audit_results = {}
-        all_findings = []
-
-        # Run each audit
-        for audit_type in audits_to_run:
-            if audit_type not in AUDIT_PROMPTS:
-                continue
 
+        # Audits are independent, so run them concurrently; the client's
+        # limiter bounds how many LLM calls are actually in flight
+        if settings.batch_audit_prompting and len(audit_types) > 1:
+            results = await self._run_combined_audits(audit_types, diff_chunks, depth)
+        else:
             if len(diff_chunks) > 1:
-                result = await self._run_audit_on_chunks(audit_type, diff_chunks, depth)
+                tasks = [self._run_audit_on_chunks(a, diff_chunks, depth) for a in audit_types]
             else:
-                result = await self._run_single_audit(audit_type, diff_content, depth)
-            audit_results[audit_type] = result
+                tasks = [self._run_single_audit(a, diff_content, depth) for a in audit_types]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
 
-            # Collect all findings
+        for audit_type, result in zip(audit_types, results):
+            if isinstance(result, BaseException):
+                result = self._exception_result(audit_type, result)
+            audit_results[audit_type] = result
             for finding in result.get("findings", []):
                 finding["audit_type"] = audit_type
-                all_findings.append(finding)
+
+        severity_counts, critical_issues = self._severity_stats(audit_results)
 
         # Calculate overall score
         overall_score = self._calculate_overall_score(audit_results)
 
         # Determine risk level
-        risk_level = self._determine_risk_level(overall_score, all_findings)
+        risk_level = self._determine_risk_level(
+            overall_score, severity_counts["critical"], severity_counts["high"]
+        )
 
         # Generate synthesis
-        synthesis = await self._synthesize_findings(audit_results, depth)
+        synthesis = await self._synthesize_findings(
+            audit_results, depth, overall_score, severity_counts, critical_issues
+        )
 
         return {
             "overall_score": overall_score,
             "risk_level": risk_level,
             "audits": audit_results,
             "synthesis": synthesis,
-            "total_findings": len(all_findings),
-            "critical_findings": sum(1 for f in all_findings if f.get("severity") == "critical")
+            "total_findings": sum(severity_counts.values()),
+            "critical_findings": severity_counts["critical"],
+            "depth": depth
+        }
+
+    def _is_docs_only(self, parsed_diff: ParsedDiff) -> bool:
+        return bool(parsed_diff.files) and all(
+            f.new_path.lower().endswith(DOC_EXTENSIONS) for f in parsed_diff.files
+        )
+
+    def _docs_only_result(self, audits_to_run: List[str]) -> Dict[str, Any]:
+        """Canned clean result for diffs with no code changes."""
+        audit_results = {
+            audit_type: {
+                "score": 100,
+                "findings": [],
+                "reasoning_steps": [],
+                "raw_content": None,
+                "model_used": None,
+                "tokens": {},
+                "parse_success": True,
+                "parse_error": None
+            }
+            for audit_type in audits_to_run
+            if audit_type in AUDIT_PROMPTS
+        }
+        return {
+            "overall_score": 100,
+            "risk_level": "low",
+            "audits": audit_results,
+            "synthesis": {
+                "executive_summary": "No code changes to audit; only documentation files were modified.",
+                "critical_issues": [],
+                "recommendations": [],
+                "verdict": "APPROVE"
+            },
+            "total_findings": 0,
+            "critical_findings": 0,
+            "depth": None
         }
 
     async def _run_single_audit(
@@ -82,57 +217,142 @@ class AuditOrchestrator:
         max_retries: int = 2
     ) -> Dict[str, Any]:
         """Run a single audit type with retry logic for transient failures."""
-        prompt_template = AUDIT_PROMPTS.get(audit_type)
-        if not prompt_template:
+        if audit_type not in AUDIT_PROMPTS:
             return {"error": f"Unknown audit type: {audit_type}", "findings": [], "score": None}
 
-        prompt = prompt_template.format(diff_content=diff_content)
+        cache_key = None
+        if self.cache is not None:
+            digest = hashlib.blake2b(diff_content.encode(), digest_size=16).hexdigest()
+            cache_key = f"{audit_type}:{depth}:{digest}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Audit {audit_type} served from cache")
+                return cached
+
+        prompt = render_prompt(audit_type, diff_content)
+        response = await self._analyze_with_retry(audit_type, prompt, depth, max_retries)
+        if not response.get("success", False):
+            return self._error_result(response.get("error", "Unknown error"))
+
+        parsed = self.client.parse_json_response(response.get("content", ""))
+        result = self._build_audit_result(audit_type, parsed, response)
+        # Failed parses stay uncached, here and in the client's prompt cache,
+        # so a retry can get a usable response
+        if result["parse_success"]:
+            await self.client.cache_response(response)
+            if cache_key is not None:
+                await self.cache.set(cache_key, result, settings.cache_ttl_seconds)
+        return result
+
+    async def _run_combined_audit(
+        self,
+        audit_types: List[str],
+        diff_content: str,
+        depth: str,
+        max_retries: int = 2
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run several audit types in one LLM call and split the result per audit."""
+        prompt = render_combined_prompt(audit_types, diff_content)
+        # One reply carries every audit's findings, so it gets every audit's budget
+        response = await self._analyze_with_retry(
+            "combined", prompt, depth, max_retries,
+            max_tokens=AUDIT_MAX_TOKENS * len(audit_types)
+        )
+        if not response.get("success", False):
+            error = response.get("error", "Unknown error")
+            return {audit_type: self._error_result(error) for audit_type in audit_types}
+
+        parsed = self.client.parse_json_response(response.get("content", ""))
+        if parsed.get("parse_success", False):
+            await self.client.cache_response(response)
+        results = {}
+        for audit_type in audit_types:
+            section = parsed.get(audit_type) if parsed.get("parse_success", False) else None
+            if isinstance(section, dict):
+                section = dict(section, parse_success=True)
+            elif parsed.get("parse_success", False):
+                section = {"error": f"Combined response has no {audit_type} section", "parse_success": False}
+            else:
+                section = parsed
+            results[audit_type] = self._build_audit_result(audit_type, section, response)
+            # The one request's usage is reported on the first audit only, so
+            # summing tokens across audits doesn't count it once per section
+            if audit_type != audit_types[0]:
+                results[audit_type]["tokens"] = {}
+        return results
+
+    async def _run_combined_audits(
+        self,
+        audit_types: List[str],
+        diff_chunks: List[str],
+        depth: str
+    ) -> List[Dict[str, Any]]:
+        """Run the combined audit on each chunk; results are in audit_types order."""
+        chunk_results = await asyncio.gather(
+            *(self._run_combined_audit(audit_types, chunk, depth) for chunk in diff_chunks),
+            return_exceptions=True
+        )
+        for i, chunk_result in enumerate(chunk_results):
+            if isinstance(chunk_result, BaseException):
+                chunk_results[i] = {
+                    audit_type: self._exception_result(audit_type, chunk_result)
+                    for audit_type in audit_types
+                }
+
+        if len(chunk_results) == 1:
+            return [chunk_results[0][audit_type] for audit_type in audit_types]
+        return [
+            self._merge_chunk_results(audit_type, [chunk[audit_type] for chunk in chunk_results])
+            for audit_type in audit_types
+        ]
 
-        last_error = None
+    async def _analyze_with_retry(
+        self,
+        label: str,
+        prompt: str,
+        depth: str,
+        max_retries: int = 2,
+        max_tokens: int = AUDIT_MAX_TOKENS
+    ) -> Dict[str, Any]:
+        """Call the LLM, retrying retryable failures with exponential backoff."""
         for attempt in range(max_retries + 1):
-            response = self.client.analyze(
+            response = await self.client.analyze(
                 prompt=prompt,
                 depth=depth,
-                temperature=0.1
+                temperature=0.1,
+                max_tokens=max_tokens,
+                stop_at_json_end=True
             )
 
-            # If successful, break out of retry loop
             if response.get("success", False):
-                break
+                return response
 
             # If error is not retryable, don't retry
+            last_error = response.get("error", "Unknown error")
             if not response.get("retryable", False):
-                last_error = response.get("error", "Unknown error")
-                logger.warning(f"Audit {audit_type} failed (non-retryable): {last_error}")
-                return {
-                    "error": last_error,
-                    "findings": [],
-                    "score": None,
-                    "reasoning_steps": []
-                }
+                logger.warning(f"Audit {label} failed (non-retryable): {last_error}")
+                return response
 
-            # Retryable error - retry with exponential backoff (non-blocking)
-            last_error = response.get("error", "Unknown error")
+            # Retryable error - retry with jittered exponential backoff (non-blocking);
+            # the jitter keeps concurrent audits from retrying in lockstep
             if attempt < max_retries:
-                delay = 2 * (2 ** attempt)  # 2s, 4s
+                delay = random.uniform(1, 2 * (2 ** attempt))  # up to 2s, 4s
                 logger.info(
-                    f"Audit {audit_type} attempt {attempt + 1} failed: {last_error}. Retrying in {delay}s..."
+                    f"Audit {label} attempt {attempt + 1} failed: {last_error}. "
+                    f"Retrying in {delay:.1f}s..."
                 )
                 await asyncio.sleep(delay)
 
-        # Check if we exhausted retries
-        if response.get("error"):
-            logger.error(f"Audit {audit_type} failed after {max_retries + 1} attempts: {last_error}")
-            return {
-                "error": last_error or response.get("error"),
-                "findings": [],
-                "score": None,
-                "reasoning_steps": []
-            }
-
-        # Parse the JSON response
-        parsed = self.client.parse_json_response(response.get("content", ""))
+        logger.error(f"Audit {label} failed after {max_retries + 1} attempts: {last_error}")
+        return response
 
+    def _build_audit_result(
+        self,
+        audit_type: str,
+        parsed: Dict[str, Any],
+        response: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Shape a parsed model response into an audit result."""
         # Handle parse failure - score should be None, not a default value
         score = parsed.get("score")
         if score is None and not parsed.get("parse_success", False):
@@ -152,6 +372,18 @@ class AuditOrchestrator:
             "parse_error": parse_error
         }
 
+    def _error_result(self, error: str) -> Dict[str, Any]:
+        return {
+            "error": error,
+            "findings": [],
+            "score": None,
+            "reasoning_steps": []
+        }
+
+    def _exception_result(self, audit_type: str, error: BaseException) -> Dict[str, Any]:
+        logger.error(f"Audit {audit_type} raised {type(error).__name__}: {error}")
+        return self._error_result(f"Audit failed: {str(error)[:100]}")
+
     async def _run_audit_on_chunks(
         self,
         audit_type: str,
@@ -159,13 +391,23 @@ class AuditOrchestrator:
         depth: str
     ) -> Dict[str, Any]:
         """Run an audit across multiple diff chunks and merge results."""
+        # Chunks are independent; the client's adaptive limiter bounds the combined fan-out
+        results = await asyncio.gather(
+            *(self._run_single_audit(audit_type, chunk, depth) for chunk in diff_chunks),
+            return_exceptions=True
+        )
+        return self._merge_chunk_results(audit_type, results)
+
+    def _merge_chunk_results(self, audit_type: str, results: List[Any]) -> Dict[str, Any]:
+        """Merge per-chunk results of one audit type into a single result."""
         merged_findings: List[Dict[str, Any]] = []
         scores: List[int] = []
         parse_success = True
         errors = []
 
-        for chunk in diff_chunks:
-            result = await self._run_single_audit(audit_type, chunk, depth)
+        for result in results:
+            if isinstance(result, BaseException):
+                result = self._exception_result(audit_type, result)
             merged_findings.extend(result.get("findings", []))
             if result.get("score") is not None:
                 scores.append(result.get("score"))
@@ -190,57 +432,183 @@ class AuditOrchestrator:
         }
 
     def _chunk_diff(self, diff_content: str) -> List[str]:
-        """Split diff into per-file chunks to keep prompt sizes manageable."""
+        """Split diff into per-file chunks to keep prompt sizes manageable.
+
+        Whole files are packed into as few chunks as fit. An oversized file is
+        split at content-defined hunk boundaries instead, and its pieces are
+        sent on their own, so an edit elsewhere in the diff leaves them, and
+        their per-audit cache entries, unchanged.
+        """
         max_chunk_size = settings.chunk_size_chars
         if max_chunk_size <= 0 or len(diff_content) <= max_chunk_size:
             return [diff_content]
 
-        chunks = []
-        current = []
-
-        for line in diff_content.split('\n'):
-            if line.startswith('diff --git ') and current:
-                chunks.append('\n'.join(current))
-                current = [line]
+        # Work on (start, end) offsets into diff_content: files are only
+        # copied out once, when their chunk is emitted
+        bounds = _line_offsets(diff_content, _FILE_HEADER)
+        if not bounds or bounds[0] != 0:
+            bounds.insert(0, 0)
+        spans: List[Tuple[int, int]] = []
+        sizes: List[int] = []
+        pieces: List[str] = []
+        missing_newline = not diff_content.endswith('\n')
+        for start, end in zip(bounds, bounds[1:] + [len(diff_content)]):
+            size = end - start
+            if missing_newline and end == len(diff_content):
+                size += 1  # the newline _file_slice adds to the last file
+            if size > max_chunk_size:
+                # Pieces are never repacked, so their boundaries stay stable
+                file_chunk = self._file_slice(diff_content, start, end)
+                pieces.extend(self._split_file_chunk(file_chunk, max_chunk_size))
             else:
-                current.append(line)
+                spans.append((start, end))
+                sizes.append(size)
+
+        bins = self._pack_chunks(sizes, max_chunk_size)
+        return [self._emit_chunk(diff_content, spans, members) for members in bins] + pieces
 
-        if current:
-            chunks.append('\n'.join(current))
+    def _file_slice(self, diff_content: str, start: int, end: int) -> str:
+        # Packing can move the last file mid-chunk, where it needs its newline
+        if end == len(diff_content) and not diff_content.endswith('\n'):
+            return diff_content[start:end] + '\n'
+        return diff_content[start:end]
+
+    def _emit_chunk(
+        self,
+        diff_content: str,
+        spans: List[Tuple[int, int]],
+        members: List[int]
+    ) -> str:
+        """Build one packed chunk, slicing runs of adjacent files in one go."""
+        parts: List[str] = []
+        run_start = run_end = None
+        for start, end in (spans[i] for i in members):
+            if start == run_end:
+                run_end = end
+                continue
+            if run_start is not None:
+                parts.append(self._file_slice(diff_content, run_start, run_end))
+            run_start, run_end = start, end
+        if run_start is not None:
+            parts.append(self._file_slice(diff_content, run_start, run_end))
+        return parts[0] if len(parts) == 1 else ''.join(parts)
+
+    def _split_file_chunk(self, file_chunk: str, max_chunk_size: int) -> List[str]:
+        """Split one oversized file diff between hunks, at content-defined points.
+
+        A hunk starts a new piece when its body hashes to a cut point (once the
+        piece holds a quarter of the budget) or when it would overflow the
+        budget. Cut points depend only on each hunk's own lines, so an edit in
+        one part of a file leaves the other pieces, and their per-audit cache
+        entries, unchanged. Every piece repeats the file header; a single hunk
+        larger than the budget is kept whole.
+        """
+        parts = _split_before(file_chunk, _HUNK_HEADER)
+        header, hunks = parts[0], parts[1:]
+        if len(hunks) <= 1:
+            return [file_chunk]
+
+        min_size = max_chunk_size // 4
+        pieces = []
+        current: List[str] = []
+        size = len(header)
+        for hunk in hunks:
+            if current and (
+                size + len(hunk) > max_chunk_size
+                or (size >= min_size and self._is_cut_point(hunk))
+            ):
+                pieces.append(header + ''.join(current))
+                current = []
+                size = len(header)
+            current.append(hunk)
+            size += len(hunk)
+        pieces.append(header + ''.join(current))
+        return pieces
+
+    def _is_cut_point(self, hunk: str) -> bool:
+        # Hash the body only: the @@ line numbers shift with edits above the hunk
+        body = hunk[hunk.find('\n') + 1:]
+        return zlib.crc32(body.encode()) & _CUT_MASK == 0
+
+    def _pack_chunks(self, chunk_sizes: List[int], max_chunk_size: int) -> List[List[int]]:
+        """Pack per-file chunks into as few chunks as fit, first-fit decreasing.
+
+        Takes chunk sizes and returns the chunk indices in each packed chunk.
+        Each file's diff stays intact. Files keep their diff order within a
+        packed chunk.
+        """
+        bins: List[List[int]] = []
+        sizes: List[int] = []
+        for i in sorted(range(len(chunk_sizes)), key=chunk_sizes.__getitem__, reverse=True):
+            size = chunk_sizes[i]
+            for b, used in enumerate(sizes):
+                if used + size <= max_chunk_size:
+                    bins[b].append(i)
+                    sizes[b] = used + size
+                    break
+            else:
+                bins.append([i])
+                sizes.append(size)
 
-        return chunks if chunks else [diff_content]
+        return [sorted(members) for members in bins]
 
     async def _synthesize_findings(
         self,
         audit_results: Dict[str, Any],
-        depth: str
+        depth: str,
+        overall_score: Optional[int] = None,
+        severity_counts: Optional[Counter] = None,
+        critical_issues: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Synthesize all findings into executive summary."""
+        """Synthesize all findings into executive summary.
+
+        Precomputed severity stats from run_full_audit are reused by the fallback
+        paths instead of rescanning the findings.
+        """
+        if severity_counts is None or critical_issues is None:
+            severity_counts, critical_issues = self._severity_stats(audit_results)
+
         summary_data = {}
         for audit_type, result in audit_results.items():
+            findings = result.get("findings", [])
+            # Stable sort: equally severe findings keep the auditor's order
+            top = sorted(findings, key=self._severity_rank)[:SYNTHESIS_TOP_FINDINGS]
             summary_data[audit_type] = {
                 "score": result.get("score") if result.get("score") is not None else 50,
-                "finding_count": len(result.get("findings", [])),
-                "findings": result.get("findings", [])[:3]
+                "finding_count": len(findings),
+                "findings": [self._trim_finding(f) for f in top]
             }
 
-        prompt = SYNTHESIS_PROMPT.format(
-            audit_results=json.dumps(summary_data, indent=2)
-        )
+        # orjson output is compact: indentation whitespace would be billed as prompt tokens
+        summary_json = orjson.dumps(summary_data)
+
+        cache_key = None
+        if self.cache is not None:
+            digest = hashlib.blake2b(summary_json, digest_size=16).hexdigest()
+            cache_key = f"synth:{depth}:{digest}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Synthesis served from cache")
+                return cached
+
+        prompt = render_synthesis_prompt(summary_json.decode())
 
-        response = self.client.analyze(
+        response = await self.client.analyze(
             prompt=prompt,
             depth=depth,
-            temperature=0.2
+            temperature=0.2,
+            stop_at_json_end=True
         )
 
         if response.get("error"):
-            fallback_verdict = self._compute_fallback_verdict(audit_results)
+            fallback_verdict = self._compute_fallback_verdict(
+                audit_results, overall_score, severity_counts
+            )
             logger.warning(f"Synthesis failed, using fallback verdict: {fallback_verdict}")
             return {
                 "executive_summary": "Analysis complete. Review individual audit results.",
                 "verdict": fallback_verdict,
-                "critical_issues": self._extract_critical_issues(audit_results),
+                "critical_issues": critical_issues,
                 "recommendations": [],
                 "error": response["error"]
             }
@@ -248,70 +616,101 @@ class AuditOrchestrator:
         parsed = self.client.parse_json_response(response.get("content", ""))
 
         if not parsed.get("parse_success", False):
-            fallback_verdict = self._compute_fallback_verdict(audit_results)
+            fallback_verdict = self._compute_fallback_verdict(
+                audit_results, overall_score, severity_counts
+            )
             logger.warning(f"Synthesis parse failed, using fallback verdict: {fallback_verdict}")
             return {
                 "executive_summary": "Analysis complete. Review individual audit results.",
                 "verdict": fallback_verdict,
-                "critical_issues": self._extract_critical_issues(audit_results),
+                "critical_issues": critical_issues,
                 "recommendations": [],
                 "error": parsed.get("error", "Failed to parse synthesis response")
             }
 
-        return {
+        synthesis = {
             "executive_summary": parsed.get("executive_summary", ""),
             "critical_issues": parsed.get("critical_issues", []),
             "recommendations": parsed.get("recommendations", []),
             "verdict": parsed.get("verdict", "APPROVE_WITH_CHANGES")
         }
+        # Fallback verdicts stay uncached so a re-run can still get a real synthesis
+        await self.client.cache_response(response)
+        if cache_key is not None:
+            await self.cache.set(cache_key, synthesis, settings.cache_ttl_seconds)
+        return synthesis
+
+    def _severity_rank(self, finding: Any) -> int:
+        severity = finding.get("severity") if isinstance(finding, dict) else None
+        return _SEVERITY_RANK.get(severity, len(_SEVERITY_RANK))
+
+    def _trim_finding(self, finding: Any) -> Any:
+        """Bound a finding's description so the synthesis prompt size stays predictable."""
+        description = finding.get("description") if isinstance(finding, dict) else None
+        if isinstance(description, str) and len(description) > SYNTHESIS_DESCRIPTION_CHARS:
+            return {**finding, "description": description[:SYNTHESIS_DESCRIPTION_CHARS]}
+        return finding
+
+    def _compute_fallback_verdict(
+        self,
+        audit_results: Dict[str, Any],
+        overall: Optional[int] = None,
+        severity_counts: Optional[Counter] = None
+    ) -> str:
+        """Compute verdict from individual audit scores when synthesis fails.
 
-    def _compute_fallback_verdict(self, audit_results: Dict[str, Any]) -> str:
-        """Compute verdict from individual audit scores when synthesis fails."""
-        overall = self._calculate_overall_score(audit_results)
-
-        has_critical = any(
-            f.get("severity") == "critical"
-            for audit in audit_results.values()
-            for f in audit.get("findings", [])
-        )
-
-        high_count = sum(
-            1 for audit in audit_results.values()
-            for f in audit.get("findings", [])
-            if f.get("severity") == "high"
-        )
+        Pass the already-computed overall score and severity counts to skip
+        recomputing them.
+        """
+        if overall is None:
+            overall = self._calculate_overall_score(audit_results)
+        if severity_counts is None:
+            severity_counts, _ = self._severity_stats(audit_results)
 
-        if has_critical or overall < 40:
+        if severity_counts["critical"] or overall < 40:
             return "REQUEST_CHANGES"
-        if overall < 60 or high_count >= 3:
+        if overall < 60 or severity_counts["high"] >= 3:
             return "APPROVE_WITH_CHANGES"
         if overall < 80:
             return "APPROVE_WITH_CHANGES"
         return "APPROVE"
 
-    def _extract_critical_issues(self, audit_results: Dict[str, Any]) -> List[str]:
-        """Extract critical issues from audit results for fallback synthesis."""
-        critical_issues = []
+    def _severity_stats(self, audit_results: Dict[str, Any]) -> Tuple[Counter, List[str]]:
+        """Count findings by severity and collect the first critical/high issues.
+
+        Returns the severity Counter (its values sum to the total finding count)
+        and up to five formatted issues for fallback synthesis.
+        """
+        severity_counts = Counter(
+            f.get("severity") for f in chain.from_iterable(
+                result.get("findings", []) for result in audit_results.values()
+            )
+        )
+
+        critical_issues: List[str] = []
+        if not (severity_counts["critical"] or severity_counts["high"]):
+            return severity_counts, critical_issues
         for audit_type, result in audit_results.items():
             for finding in result.get("findings", []):
                 if finding.get("severity") in ("critical", "high"):
                     title = finding.get("title") or finding.get("type") or "Issue"
                     desc = finding.get("description", "")[:100]
                     critical_issues.append(f"[{audit_type}] {title}: {desc}")
-        return critical_issues[:5]
+                    if len(critical_issues) == 5:
+                        return severity_counts, critical_issues
+        return severity_counts, critical_issues
 
     def _calculate_overall_score(self, audit_results: Dict[str, Any]) -> int:
         """Calculate weighted overall score."""
-        total_weight = 0
-        weighted_sum = 0
-
-        for audit_type, weight in self.AUDIT_WEIGHTS.items():
-            if audit_type in audit_results:
-                result = audit_results[audit_type]
-                score = result.get("score")
-                if score is not None and not result.get("error"):
-                    weighted_sum += score * weight
-                    total_weight += weight
+        pairs = [
+            (audit_results[audit_type]["score"], weight)
+            for audit_type, weight in self.AUDIT_WEIGHTS.items()
+            if audit_type in audit_results
+            and audit_results[audit_type].get("score") is not None
+            and not audit_results[audit_type].get("error")
+        ]
+        total_weight = sum(weight for _, weight in pairs)
+        weighted_sum = sum(score * weight for score, weight in pairs)
 
         if total_weight == 0:
             logger.warning("No valid audit scores available, returning 50")
@@ -322,12 +721,10 @@ class AuditOrchestrator:
     def _determine_risk_level(
         self,
         overall_score: int,
-        findings: List[Dict[str, Any]]
+        critical_count: int,
+        high_count: int
     ) -> str:
-        """Determine risk level based on score and findings."""
-        critical_count = sum(1 for f in findings if f.get("severity") == "critical")
-        high_count = sum(1 for f in findings if f.get("severity") == "high")
-
+        """Determine risk level based on score and finding severity counts."""
         if critical_count > 0:
             return "critical"
         if overall_score < 50 or high_count >= 3:
@@ -340,4 +737,4 @@ class AuditOrchestrator:
 def create_orchestrator(api_key: str = None) -> AuditOrchestrator:
     """Factory function to create orchestrator with client."""
     client = AkashMLClient(api_key=api_key)
-    return AuditOrchestrator(client)
+    return AuditOrchestrator(client, cache=InMemoryCache(max_entries=settings.cache_max_entries))
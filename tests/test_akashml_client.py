@@ -0,0 +1,162 @@
+from types import SimpleNamespace
+
+import httpx
+from openai import APIError, RateLimitError
+
+from app.services.akashml_client import AkashMLClient
+from app.services.orchestrator import AuditOrchestrator
+
+
+class FakeStream:
+    def __init__(self, text):
+        self.chunks = [
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))]),
+            SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5), choices=[]),
+        ]
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class BrokenStream(FakeStream):
+    """Yields the first chunk, then fails the way a server error event does."""
+
+    def __init__(self, text, error):
+        super().__init__(text)
+        self.error = error
+
+    async def __aiter__(self):
+        yield self.chunks[0]
+        raise self.error
+
+
+class FakeCompletions:
+    """Returns the queued replies in order, repeating the last.
+
+    Exceptions are raised; strings are streamed; streams are returned as-is.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        if isinstance(reply, FakeStream):
+            return reply
+        return FakeStream(reply)
+
+
+def rate_limited() -> RateLimitError:
+    request = httpx.Request("POST", "https://api.example.test/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def stream_error() -> APIError:
+    request = httpx.Request("POST", "https://api.example.test/v1/chat/completions")
+    return APIError("upstream model error", request=request, body=None)
+
+
+def make_client(replies):
+    client = AkashMLClient(api_key="akml-test")
+    completions = FakeCompletions(replies)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+class TestPromptCaching:
+    async def test_response_is_cached_only_when_committed(self):
+        client, completions = make_client(['{"score": 90, "findings": []}'])
+        first = await client.analyze("prompt one")
+        await client.analyze("prompt one")
+        assert completions.calls == 2
+
+        await client.cache_response(first)
+        hit = await client.analyze("prompt one")
+        assert completions.calls == 2
+        assert hit["content"] == first["content"]
+        assert "cache_key" not in hit
+
+    async def test_unparseable_audit_reply_is_not_cached(self):
+        client, completions = make_client(["not json at all", '{"score": 90, "findings": []}'])
+        orchestrator = AuditOrchestrator(client)
+        diff = "diff --git a/app.py b/app.py\n@@ -1 +1 @@\n-a = 1\n+a = 2\n"
+
+        failed = await orchestrator._run_single_audit("security", diff, "standard")
+        assert failed["parse_success"] is False
+        retried = await orchestrator._run_single_audit("security", diff, "standard")
+        assert retried["parse_success"] is True
+        assert completions.calls == 2
+
+        await orchestrator._run_single_audit("security", diff, "standard")
+        assert completions.calls == 2
+
+
+class TestRetries:
+    def test_sdk_retries_are_disabled(self):
+        assert AkashMLClient(api_key="akml-test").client.max_retries == 0
+
+    async def test_exhausted_open_retries_are_not_retried_again(self):
+        client, completions = make_client([rate_limited()])
+        response = await client.analyze("prompt")
+        assert completions.calls == 4
+        assert response["error_type"] == "rate_limit"
+        assert response["retryable"] is False
+        assert client._limiter._in_flight == 0
+
+    async def test_recovers_after_transient_open_failure(self):
+        client, completions = make_client([rate_limited(), '{"score": 90}'])
+        response = await client.analyze("prompt")
+        assert response["success"] is True
+        assert completions.calls == 2
+        assert client._limiter._in_flight == 0
+
+    async def test_error_event_mid_stream_returns_error_dict(self):
+        client, completions = make_client([BrokenStream('{"score"', stream_error())])
+        response = await client.analyze("prompt")
+        assert response["success"] is False
+        assert response["error_type"] == "api_error"
+        assert response["retryable"] is True
+        assert completions.calls == 1
+        assert client._limiter._in_flight == 0
+
+
+class TestUsage:
+    async def test_usage_reported_when_stream_completes(self):
+        client, _ = make_client(['{"score": 90}'])
+        response = await client.analyze("prompt")
+        assert response["usage"] == {"prompt_tokens": 10, "completion_tokens": 5}
+
+    async def test_usage_unknown_when_stream_stops_early(self):
+        client, _ = make_client(['{"score": 90}'])
+        response = await client.analyze("prompt", stop_at_json_end=True)
+        assert response["content"] == '{"score": 90}'
+        assert response["usage"] == {"prompt_tokens": None, "completion_tokens": None}
+
+
+class TestAnalyzeStream:
+    async def test_yields_text_and_frees_slot(self):
+        client, _ = make_client(['{"score": 90}'])
+        async with client.analyze_stream("prompt") as deltas:
+            text = "".join([delta async for delta in deltas])
+        assert text == '{"score": 90}'
+        assert client._limiter._in_flight == 0
+
+    async def test_early_exit_closes_stream_and_frees_slot(self):
+        stream = FakeStream('{"score": 90}')
+        client, _ = make_client([stream])
+        async with client.analyze_stream("prompt") as deltas:
+            async for _ in deltas:
+                assert client._limiter._in_flight == 1
+                break
+        assert stream.closed is True
+        assert client._limiter._in_flight == 0
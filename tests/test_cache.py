@@ -1,30 +1,76 @@
-import unittest
-import asyncio
+import sqlite3
 
-from app.services.cache import InMemoryCache
+from app.services.cache import InMemoryCache, PromptCache, TieredCache
 
 
-class TestInMemoryCache(unittest.TestCase):
-    def test_set_and_get(self):
+class TestInMemoryCache:
+    async def test_set_and_get(self):
         cache = InMemoryCache(max_entries=2)
+        await cache.set("key", "value", ttl_seconds=30)
+        assert cache.get("key") == "value"
 
-        async def run():
-            await cache.set("key", "value", ttl_seconds=30)
-            value = await cache.get("key")
-            self.assertEqual(value, "value")
+    async def test_ttl_expiration(self):
+        cache = InMemoryCache(max_entries=2)
+        await cache.set("key", "value", ttl_seconds=0)
+        assert cache.get("key") is None
 
-        asyncio.run(run())
+    async def test_evicts_least_recently_used(self):
+        cache = InMemoryCache(max_entries=2)
+        await cache.set("a", 1, ttl_seconds=30)
+        await cache.set("b", 2, ttl_seconds=30)
+        cache.get("a")
+        await cache.set("c", 3, ttl_seconds=30)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
 
-    def test_ttl_expiration(self):
+    async def test_overwrite_does_not_evict(self):
         cache = InMemoryCache(max_entries=2)
+        await cache.set("a", 1, ttl_seconds=30)
+        await cache.set("b", 2, ttl_seconds=30)
+        await cache.set("a", 10, ttl_seconds=30)
+        assert cache.get("a") == 10
+        assert cache.get("b") == 2
+
+
+class TestTieredCache:
+    async def test_survives_restart(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        first = TieredCache(path, max_entries=2)
+        await first.set("key", {"score": 90}, ttl_seconds=30)
+        first.close()
+
+        second = TieredCache(path, max_entries=2)
+        assert second.get("key") == {"score": 90}
+        assert second.get("missing") is None
+        second.close()
+
+    async def test_corrupt_row_is_a_miss_and_dropped(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = TieredCache(path, max_entries=2)
+        await cache.set("key", {"score": 90}, ttl_seconds=30)
+        cache.close()
+
+        db = sqlite3.connect(path)
+        db.execute("UPDATE cache SET value = ? WHERE key = ?", (b"{not json", "key"))
+        db.commit()
+        db.close()
 
-        async def run():
-            await cache.set("key", "value", ttl_seconds=0)
-            value = await cache.get("key")
-            self.assertIsNone(value)
+        reopened = TieredCache(path, max_entries=2)
+        assert reopened.get("key") is None
+        count = reopened._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        assert count == 0
+        reopened.close()
 
-        asyncio.run(run())
 
+class TestPromptCache:
+    def test_key_ignores_index_lines_and_whitespace(self):
+        a = "diff --git a/x.py b/x.py\nindex 1a2b3c4..5d6e7f8 100644\n+x = 1\n"
+        b = "diff --git a/x.py b/x.py\r\nindex 9f8e7d6..0a1b2c3 100644\r\n+x = 1  \r\n"
+        assert PromptCache.key("m", "sys", a, 0.1, 100) == PromptCache.key("m", "sys", b, 0.1, 100)
 
-if __name__ == "__main__":
-    unittest.main()
+    def test_key_depends_on_code_and_parameters(self):
+        base = PromptCache.key("m", "sys", "+x = 1\n", 0.1, 100)
+        assert base != PromptCache.key("m", "sys", "+x = 2\n", 0.1, 100)
+        assert base != PromptCache.key("other", "sys", "+x = 1\n", 0.1, 100)
+        assert base != PromptCache.key("m", "sys", "+x = 1\n", 0.0, 100)
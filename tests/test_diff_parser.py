@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from app.services.diff_parser import DiffParser
@@ -22,6 +23,57 @@ class TestDiffParser(unittest.TestCase):
         self.assertEqual(parsed.total_deletions, 1)
         self.assertIn("python", parsed.languages)
 
+    def test_parse_multiple_files_and_hunk_content(self):
+        diff = (
+            "diff --git a/new.py b/new.py\n"
+            "new file mode 100644\n"
+            "--- /dev/null\n"
+            "+++ b/new.py\n"
+            "@@ -0,0 +1 @@\n"
+            "+x = 1\n"
+            "diff --git a/old.js b/old.js\n"
+            "deleted file mode 100644\n"
+            "@@ -1,2 +0,0 @@\n"
+            "-a()\n"
+            "-b()\n"
+        )
+        parsed = DiffParser().parse(diff)
+
+        new_file, old_file = parsed.files
+        self.assertTrue(new_file.is_new)
+        self.assertTrue(old_file.is_deleted)
+        self.assertEqual(new_file.hunks[0].content, "+x = 1\n")
+        self.assertEqual(old_file.hunks[0].deletions, ["a()", "b()"])
+
+    def test_parse_stream_matches_parse(self):
+        diff = (
+            "diff --git a/app.py b/app.py\n"
+            "@@ -1 +1,2 @@\n"
+            " x = 1\n"
+            "+y = 2\n"
+        )
+        parser = DiffParser()
+        from_string = parser.parse(diff)
+        from_stream = parser.parse_stream(io.StringIO(diff))
+
+        self.assertEqual(from_stream.file_count, 1)
+        self.assertEqual(from_stream.files[0].hunks[0].content, from_string.files[0].hunks[0].content)
+        self.assertEqual(from_stream.total_additions, 1)
+
+    def test_hunk_equality_ignores_content_memo(self):
+        diff = (
+            "diff --git a/app.py b/app.py\n"
+            "@@ -1 +1,2 @@\n"
+            " x = 1\n"
+            "+y = 2\n"
+        )
+        first = DiffParser().parse(diff).files[0].hunks[0]
+        second = DiffParser().parse(diff).files[0].hunks[0]
+        self.assertEqual(first, second)
+
+        first.content
+        self.assertEqual(first, second)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,54 @@
+from app.services.akashml_client import _JsonObjectEnd
+
+
+def feed_all(chunks):
+    """Feed chunks in order; return the span reported and the joined text."""
+    tracker = _JsonObjectEnd()
+    for chunk in chunks:
+        span = tracker.feed(chunk)
+        if span is not None:
+            return span, "".join(chunks)
+    return None, "".join(chunks)
+
+
+def split_every(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonObjectEnd:
+    def test_bare_object_in_one_chunk(self):
+        span, text = feed_all(['{"score": 90, "findings": []} trailing'])
+        assert text[span[0]:span[1]] == '{"score": 90, "findings": []}'
+
+    def test_fenced_object(self):
+        span, text = feed_all(['```json\n{"a": {"b": 1}}\n```'])
+        assert text[span[0]:span[1]] == '{"a": {"b": 1}}'
+
+    def test_braces_inside_strings_are_ignored(self):
+        body = '{"description": "use {x} and } or {{", "score": 1}'
+        span, text = feed_all([body + "\nmore"])
+        assert text[span[0]:span[1]] == body
+
+    def test_escaped_quotes_keep_string_open(self):
+        body = r'{"fix": "say \"}\" then \\", "score": 2}'
+        span, text = feed_all([body + " tail"])
+        assert text[span[0]:span[1]] == body
+
+    def test_every_chunk_boundary(self):
+        body = r'{"a": "x\\\"}{", "b": {"c": "\\"}, "d": "}"}'
+        for size in range(1, len(body) + 1):
+            span, text = feed_all(split_every("```json\n" + body + "\n```", size))
+            assert span is not None, size
+            assert text[span[0]:span[1]] == body, size
+
+    def test_escape_split_across_chunks(self):
+        span, text = feed_all(['{"a": "\\', '"}', '", "b": 1}'])
+        assert text[span[0]:span[1]] == '{"a": "\\"}", "b": 1}'
+
+    def test_prose_before_object_disables_tracking(self):
+        span, _ = feed_all(["Here is {the} result: ", '{"score": 1}'])
+        assert span is None
+
+    def test_unclosed_object_reports_nothing(self):
+        span, _ = feed_all(split_every('{"a": {"b": "}"}', 3))
+        assert span is None
@@ -0,0 +1,33 @@
+import asyncio
+
+from app.services.limiter import AdaptiveConcurrencyLimiter
+
+
+class TestAdaptiveConcurrencyLimiter:
+    async def test_bounds_in_flight_calls(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=3)
+        in_flight = 0
+        peak = 0
+
+        async def call():
+            nonlocal in_flight, peak
+            async with limiter:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(call() for _ in range(10)))
+        assert peak == 3
+
+    async def test_overload_halves_once_per_burst_and_success_recovers(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+        async with limiter:
+            pass
+        for _ in range(4):
+            limiter.record_overload()
+        assert limiter.limit == 4
+
+        for _ in range(4):
+            limiter.record_success()
+        assert limiter.limit == 5
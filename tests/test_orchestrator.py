@@ -0,0 +1,183 @@
+import random
+
+from app.config import settings
+from app.services.akashml_client import AkashMLClient
+from app.services.diff_parser import DiffParser
+from app.services.orchestrator import AuditOrchestrator
+
+SMALL_DIFF = "diff --git a/app.py b/app.py\n@@ -1 +1 @@\n-a = 1\n+a = 2\n"
+
+
+class FakeClient:
+    """Stands in for AkashMLClient, answering every call with one canned reply."""
+
+    route_depth = AkashMLClient.route_depth
+    DEPTH_ORDER = AkashMLClient.DEPTH_ORDER
+    parse_json_response = AkashMLClient.parse_json_response
+
+    def __init__(self, content='{"score": 80, "findings": []}'):
+        self.content = content
+        self.depths = []
+        self.max_tokens = []
+        self.usage = {"prompt_tokens": 10, "completion_tokens": 5}
+
+    async def analyze(self, prompt, depth="standard", max_tokens=4096, **kwargs):
+        self.depths.append(depth)
+        self.max_tokens.append(max_tokens)
+        return {"success": True, "content": self.content, "model": "fake", "usage": self.usage}
+
+    async def cache_response(self, response):
+        pass
+
+
+class TestDepthRouting:
+    async def test_explicit_depth_is_honoured(self):
+        client = FakeClient()
+        orchestrator = AuditOrchestrator(client)
+        parsed = DiffParser().parse(SMALL_DIFF)
+        result = await orchestrator.run_full_audit(SMALL_DIFF, depth="deep", parsed_diff=parsed)
+        assert set(client.depths) == {"deep"}
+        assert result["depth"] == "deep"
+
+    async def test_omitted_depth_routes_small_diffs(self):
+        client = FakeClient()
+        orchestrator = AuditOrchestrator(client)
+        parsed = DiffParser().parse(SMALL_DIFF)
+        result = await orchestrator.run_full_audit(SMALL_DIFF, parsed_diff=parsed)
+        assert set(client.depths) == {"quick"}
+        assert result["depth"] == "quick"
+
+    async def test_docs_only_diffs_are_audited_by_default(self):
+        for path in ("README.md", "requirements.txt"):
+            client = FakeClient()
+            orchestrator = AuditOrchestrator(client)
+            diff = f"diff --git a/{path} b/{path}\n@@ -1 +1 @@\n-requests\n+reqeusts\n"
+            await orchestrator.run_full_audit(diff, parsed_diff=DiffParser().parse(diff))
+            assert client.depths, path
+
+
+class TestCombinedAudit:
+    async def test_splits_sections_per_audit(self):
+        client = FakeClient(
+            '```json\n{"security": {"score": 40, "findings": [{"severity": "high", "title": "SQLi"}]},'
+            ' "quality": {"score": 90, "findings": []}}\n```'
+        )
+        orchestrator = AuditOrchestrator(client)
+        results = await orchestrator._run_combined_audit(
+            ["security", "quality", "performance"], SMALL_DIFF, "standard"
+        )
+        assert results["security"]["score"] == 40
+        assert results["security"]["findings"][0]["title"] == "SQLi"
+        assert results["security"]["parse_success"] is True
+        assert results["quality"]["score"] == 90
+        assert results["performance"]["parse_success"] is False
+        assert results["performance"]["score"] is None
+
+    async def test_unparseable_reply_fails_every_audit(self):
+        orchestrator = AuditOrchestrator(FakeClient("not json"))
+        results = await orchestrator._run_combined_audit(["security", "quality"], SMALL_DIFF, "standard")
+        assert all(result["parse_success"] is False for result in results.values())
+
+    async def test_usage_reported_once(self):
+        client = FakeClient('{"security": {"score": 90, "findings": []}, "quality": {"score": 80, "findings": []}}')
+        orchestrator = AuditOrchestrator(client)
+        results = await orchestrator._run_combined_audit(["security", "quality"], SMALL_DIFF, "standard")
+        assert results["security"]["tokens"] == client.usage
+        assert results["quality"]["tokens"] == {}
+
+    async def test_output_budget_scales_with_audit_count(self):
+        client = FakeClient('{"security": {"score": 90, "findings": []}}')
+        orchestrator = AuditOrchestrator(client)
+        await orchestrator._run_combined_audit(
+            ["security", "quality", "performance", "best_practices"], SMALL_DIFF, "standard"
+        )
+        await orchestrator._run_single_audit("security", SMALL_DIFF, "standard")
+        assert client.max_tokens == [4 * 4096, 4096]
+
+
+def make_hunk(rng, line_no):
+    lines = "".join(f"+value_{rng.randint(0, 99999)} = {line_no}\n" for _ in range(rng.randint(1, 20)))
+    return f"@@ -{line_no},3 +{line_no},3 @@\n{lines}"
+
+
+def make_file(name, hunks):
+    return f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n" + "".join(hunks)
+
+
+def sized_file(name, size):
+    header = make_file(name, ["@@ -1 +1 @@\n"])
+    return header + "+" + "x" * (size - len(header) - 2) + "\n"
+
+
+def body_lines(text):
+    return sorted(
+        line for line in text.splitlines()
+        if not line.startswith(("diff --git ", "--- ", "+++ "))
+    )
+
+
+class TestChunkDiff:
+    MAX = 2000
+
+    def make_diff(self, big_hunks, others):
+        return make_file("big.py", big_hunks) + "".join(others)
+
+    def setup_method(self):
+        rng = random.Random(7)
+        self.big_hunks = [make_hunk(rng, i) for i in range(60)]
+        self.others = [
+            make_file(f"mod{i}.py", [make_hunk(rng, j) for j in range(rng.randint(1, 4))])
+            for i in range(30)
+        ]
+        self.orchestrator = AuditOrchestrator(FakeClient())
+
+    def test_preserves_content_and_bounds_size(self, monkeypatch):
+        monkeypatch.setattr(settings, "chunk_size_chars", self.MAX)
+        rng = random.Random(3)
+        for _ in range(200):
+            files = [
+                make_file(f"f{i}.py", [make_hunk(rng, j) for j in range(rng.randint(1, 8))])
+                for i in range(rng.randint(1, 6))
+            ]
+            diff = "".join(files)
+            if rng.random() < 0.5:
+                diff = diff.rstrip("\n")
+            chunks = self.orchestrator._chunk_diff(diff)
+            assert body_lines("".join(chunks)) == body_lines(diff)
+            for chunk in chunks:
+                # Only a chunk holding a single oversized hunk may exceed the budget
+                assert len(chunk) <= self.MAX or chunk.count("\n@@ ") == 1
+            if len(chunks) > 1:
+                assert all(chunk.endswith("\n") for chunk in chunks)
+
+    def test_small_diff_is_one_chunk(self, monkeypatch):
+        monkeypatch.setattr(settings, "chunk_size_chars", self.MAX)
+        diff = make_file("a.py", self.big_hunks[:2])
+        assert self.orchestrator._chunk_diff(diff) == [diff]
+
+    def test_boundaries_survive_an_edit_in_a_large_file(self, monkeypatch):
+        monkeypatch.setattr(settings, "chunk_size_chars", self.MAX)
+        before = self.orchestrator._chunk_diff(self.make_diff(self.big_hunks, self.others))
+        edited = list(self.big_hunks)
+        edited[5] += "+extra = 1\n"
+        after = self.orchestrator._chunk_diff(self.make_diff(edited, self.others))
+        assert len(set(before) & set(after)) >= len(before) - 2
+
+    def test_large_file_pieces_survive_an_unrelated_file_change(self, monkeypatch):
+        monkeypatch.setattr(settings, "chunk_size_chars", self.MAX)
+        before = self.orchestrator._chunk_diff(self.make_diff(self.big_hunks, self.others))
+        others = list(self.others)
+        others[10] = make_file("mod10.py", [make_hunk(random.Random(99), 1)])
+        after = self.orchestrator._chunk_diff(self.make_diff(self.big_hunks, others))
+        pieces = [chunk for chunk in before if chunk.startswith("diff --git a/big.py ")]
+        assert len(pieces) > 1
+        assert set(pieces) <= set(after)
+
+    def test_packs_files_into_fewest_chunks(self, monkeypatch):
+        monkeypatch.setattr(settings, "chunk_size_chars", self.MAX)
+        # In diff order these need three chunks; packed by size they fit in two
+        files = [sized_file(f"f{i}.py", size) for i, size in enumerate((1200, 1200, 800, 800))]
+        chunks = self.orchestrator._chunk_diff("".join(files))
+        assert len(chunks) == 2
+        assert all(len(chunk) <= self.MAX for chunk in chunks)
+        assert sorted(chunks) == sorted([files[0] + files[2], files[1] + files[3]])
@@ -0,0 +1,217 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.api.routes import (
+    MAX_LINE_LENGTH,
+    MAX_LINES,
+    AuditRequest,
+    _etag_matches,
+    _run_audit_coalesced,
+    new_cache_hasher,
+    validate_diff_content,
+)
+from app.config import settings
+from app.main import app as main_app
+from app.services.cache import InMemoryCache
+from app.services.diff_parser import DiffParser
+
+DIFF = "diff --git a/app.py b/app.py\n@@ -1 +1 @@\n-a = 1\n+a = 2\n"
+RESULT = {
+    "overall_score": 90,
+    "risk_level": "low",
+    "audits": {},
+    "synthesis": {},
+    "total_findings": 0,
+    "critical_findings": 0,
+    "depth": "standard",
+}
+
+
+class FakeOrchestrator:
+    """Blocks each run until released, so tests control when it finishes."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def run_full_audit(self, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return dict(RESULT)
+
+
+def make_app(orchestrator):
+    return SimpleNamespace(state=SimpleNamespace(orchestrator=orchestrator))
+
+
+def start(app, cache_key):
+    request = AuditRequest(diff=DIFF)
+    parsed = DiffParser().parse(DIFF)
+    return asyncio.create_task(_run_audit_coalesced(app, request, parsed, cache_key, "audit"))
+
+
+class TestCoalescing:
+    async def test_identical_requests_share_one_run(self):
+        orchestrator = FakeOrchestrator()
+        app, key = make_app(orchestrator), uuid.uuid4().hex
+        tasks = [start(app, key) for _ in range(3)]
+        await asyncio.sleep(0)
+        orchestrator.release.set()
+        results = await asyncio.gather(*tasks)
+        assert orchestrator.calls == 1
+        assert all(result["overall_score"] == 90 for result in results)
+        assert key not in routes._INFLIGHT
+
+    async def test_followers_see_the_leaders_error(self):
+        orchestrator = FakeOrchestrator(error=RuntimeError("model down"))
+        app, key = make_app(orchestrator), uuid.uuid4().hex
+        leader, follower = start(app, key), start(app, key)
+        await asyncio.sleep(0)
+        orchestrator.release.set()
+        for task in (leader, follower):
+            with pytest.raises(HTTPException) as excinfo:
+                await task
+            assert excinfo.value.status_code == 500
+        assert orchestrator.calls == 1
+
+    async def test_follower_takes_over_when_leader_is_cancelled(self):
+        orchestrator = FakeOrchestrator()
+        app, key = make_app(orchestrator), uuid.uuid4().hex
+        leader, follower = start(app, key), start(app, key)
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        orchestrator.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert (await follower)["overall_score"] == 90
+        assert orchestrator.calls == 2
+
+    async def test_request_after_a_cancelled_leader_runs_again(self):
+        orchestrator = FakeOrchestrator()
+        app, key = make_app(orchestrator), uuid.uuid4().hex
+        leader = start(app, key)
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert key not in routes._INFLIGHT
+
+        orchestrator.release.set()
+        assert (await start(app, key))["overall_score"] == 90
+        assert orchestrator.calls == 2
+
+    async def test_cancelled_follower_leaves_the_run_going(self):
+        orchestrator = FakeOrchestrator()
+        app, key = make_app(orchestrator), uuid.uuid4().hex
+        leader, follower = start(app, key), start(app, key)
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        orchestrator.release.set()
+        assert (await leader)["overall_score"] == 90
+        assert orchestrator.calls == 1
+
+
+class TestValidateDiffContent:
+    def test_line_at_the_limit_is_accepted(self):
+        validate_diff_content(DIFF + "+" + "x" * (MAX_LINE_LENGTH - 1) + "\n")
+
+    def test_line_over_the_limit_is_rejected_with_its_number(self):
+        diff = DIFF + "+" + "x" * MAX_LINE_LENGTH + "\n"
+        with pytest.raises(HTTPException) as excinfo:
+            validate_diff_content(diff)
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.detail.startswith("Line 5 ")
+
+    def test_long_last_line_without_newline_is_rejected(self):
+        with pytest.raises(HTTPException):
+            validate_diff_content(DIFF + "+" + "x" * MAX_LINE_LENGTH)
+
+    def test_many_long_valid_lines_are_accepted(self):
+        line = "+" + "x" * (MAX_LINE_LENGTH - 1) + "\n"
+        validate_diff_content(DIFF + line * 50)
+
+    def test_line_count_limit(self):
+        validate_diff_content("+x\n" * (MAX_LINES - 1))
+        with pytest.raises(HTTPException):
+            validate_diff_content("+x\n" * MAX_LINES)
+
+    def test_empty_diff_is_rejected(self):
+        with pytest.raises(HTTPException):
+            validate_diff_content("  \n")
+
+    def test_hasher_sees_the_diff_only_when_valid(self):
+        hasher = new_cache_hasher()
+        empty = hasher.hexdigest()
+        with pytest.raises(HTTPException):
+            validate_diff_content(DIFF + "+" + "x" * MAX_LINE_LENGTH, hasher)
+        assert hasher.hexdigest() == empty
+        validate_diff_content(DIFF, hasher)
+        assert hasher.hexdigest() != empty
+
+
+class CountingOrchestrator:
+    def __init__(self):
+        self.calls = 0
+
+    async def run_full_audit(self, **kwargs):
+        self.calls += 1
+        return dict(RESULT)
+
+
+class TestETag:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(settings, "akashml_api_key", "akml-test")
+        monkeypatch.setattr(routes, "cache", InMemoryCache(max_entries=8))
+        self.orchestrator = CountingOrchestrator()
+        monkeypatch.setattr(main_app.state, "orchestrator", self.orchestrator, raising=False)
+        return TestClient(main_app)
+
+    def post(self, client, headers=None):
+        return client.post("/api/v1/audit/diff", json={"diff": DIFF}, headers=headers or {})
+
+    def test_matching_etag_on_cache_hit_returns_304(self, client):
+        first = self.post(client)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        second = self.post(client, {"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+        assert self.orchestrator.calls == 1
+
+    def test_matching_etag_without_cache_entry_runs_the_audit(self, client, monkeypatch):
+        etag = self.post(client).headers["etag"]
+        monkeypatch.setattr(routes, "cache", InMemoryCache(max_entries=8))
+
+        response = self.post(client, {"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["summary"]["overall_score"] == 90
+        assert self.orchestrator.calls == 2
+
+    def test_other_etag_gets_the_full_body(self, client):
+        self.post(client)
+        response = self.post(client, {"If-None-Match": '"something-else"'})
+        assert response.status_code == 200
+        assert response.json()["metadata"]["depth"] == "standard"
+        assert self.orchestrator.calls == 1
+
+    def test_etag_matching_rules(self):
+        assert _etag_matches('"abc"', '"abc"')
+        assert _etag_matches('W/"abc"', '"abc"')
+        assert _etag_matches('"x", W/"abc"', '"abc"')
+        assert _etag_matches("*", '"abc"')
+        assert not _etag_matches('"abcd"', '"abc"')